@@ -0,0 +1,187 @@
+import base64
+import json
+import random
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LIMIT_PATH = re.compile(r"^/consignado/v1/limite/consultar/(?P<cpf>[^/]+)/(?P<id_convenio>[^/]+)$")
+CPF_PATH = "/consignado/v1/cliente/consulta-cpf"
+TOKEN_PATH = "/token"
+
+
+class MockBankerMaster:
+    """
+    Local stand-in for the Banco Master API used by the benchmarks.
+
+    Serves the token, CPF and limit endpoints from a threaded HTTP server
+    with a fixed latency and random 401 / 500 answers, and counts requests
+    per endpoint.
+    """
+
+    def __init__(self, latency: float = 0.02, unauthorized_rate: float = 0.0, error_rate: float = 0.0, convenios: int = 1, seed: int = 0, token_ttl: float = None):
+        """
+        Args:
+            latency (float): Seconds slept before answering each request.
+            unauthorized_rate (float): Share of API requests answered with 401, forcing a token refresh.
+            error_rate (float): Share of API requests answered with 500.
+            convenios (int): Convenios returned per CPF.
+            seed (int): Seed of the random failure draws.
+            token_ttl (float): Lifetime in seconds of the issued tokens, sent as JWT ``exp``; None issues opaque tokens that never expire.
+        """
+        self.latency = latency
+        self.unauthorized_rate = unauthorized_rate
+        self.error_rate = error_rate
+        self.convenios = convenios
+        self.random = random.Random(seed)
+        self.counts = {"token": 0, "cpf": 0, "limit": 0, "401": 0, "500": 0}
+        self.token_ttl = token_ttl
+        self.token = "token-0"
+        self.token_expiry = None
+        self.tokens = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                mock.handle(self, "POST")
+
+            def do_GET(self):
+                mock.handle(self, "GET")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _draw(self) -> float:
+        with self._lock:
+            return self.random.random()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def handle(self, request, method: str):
+        time.sleep(self.latency)
+        url = urlparse(request.path)
+
+        if method == "POST" and url.path == TOKEN_PATH:
+            length = int(request.headers.get("Content-Length") or 0)
+            request.rfile.read(length)
+            with self._lock:
+                self.counts["token"] += 1
+                self.token, self.token_expiry = self.issue_token(self.counts["token"])
+                self.tokens[self.token] = self.token_expiry
+                token = self.token
+            return self._reply(request, 200, {"accessToken": token, "expiresIn": self.token_ttl})
+
+        limit = LIMIT_PATH.match(url.path)
+        if method != "GET" or (url.path != CPF_PATH and not limit):
+            return self._reply(request, 404, {"message": "Not found"})
+
+        draw = self._draw()
+        if not self.authorized(request.headers.get("Authorization", "")) or draw < self.unauthorized_rate:
+            self._count("401")
+            return self._reply(request, 401, {"message": "Unauthorized"})
+        if draw < self.unauthorized_rate + self.error_rate:
+            self._count("500")
+            return self._reply(request, 500, {"message": "Internal error"})
+
+        if limit:
+            self._count("limit")
+            return self._reply(request, 200, [self.limit_item(limit["cpf"], limit["id_convenio"])])
+
+        self._count("cpf")
+        cpf = parse_qs(url.query).get("cpfRequest", [""])[0]
+        return self._reply(request, 200, [{"cpf": cpf, "idConvenio": str(100 + index)} for index in range(self.convenios)])
+
+    def authorized(self, header: str) -> bool:
+        """
+        Opaque tokens are revoked by the next one; JWTs stay valid until their ``exp``.
+        """
+        token = header.removeprefix("Bearer ")
+        if self.token_ttl is None:
+            return token == self.token
+        expiry = self.tokens.get(token)
+        return expiry is not None and time.time() < expiry
+
+    def issue_token(self, serial: int) -> tuple:
+        """
+        Opaque ``token-N``, or an unsigned JWT expiring in `token_ttl` seconds.
+        """
+        if self.token_ttl is None:
+            return f"token-{serial}", None
+        expiry = time.time() + self.token_ttl
+        encode = lambda part: base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+        return f"{encode({'alg': 'none'})}.{encode({'sub': serial, 'exp': expiry})}.", expiry
+
+    @staticmethod
+    def limit_item(cpf: str, id_convenio: str) -> dict:
+        return {
+            "cpf": cpf,
+            "nome": f"Cliente {cpf}",
+            "idConvenio": id_convenio,
+            "matricula": f"{cpf[-6:]}{id_convenio}",
+            "vlMultiploSaque": 1.5,
+            "limiteUtilizado": 250.0,
+            "limiteTotal": 5000.0,
+            "limiteDisponivel": 4750.0,
+            "vlLimiteParcela": 300.0,
+            "limiteParcelaUtilizado": 50.25,
+            "limiteParcelaDisponivel": 249.75,
+            "vlMargem": 320.1,
+            "vlMultiploCompra": 2.0,
+            "vlLimiteCompra": 1000.0,
+            "cdBanco": "243",
+            "cdAgencia": "0001",
+            "cdConta": "123456",
+            "naoPerturbe": False,
+            "saqueComplementar": True,
+            "contratoRefinanciamento": {
+                "refinanciamento": True,
+                "numeroContratos": "1",
+                "vlMaximoParcela": 150.0,
+                "valor": 3200.5,
+            },
+        }
+
+    @staticmethod
+    def _reply(request, status: int, payload):
+        body = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
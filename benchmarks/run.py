@@ -0,0 +1,170 @@
+"""
+Throughput benchmark for the ETL and the Banco Master request loops.
+
+Runs `ExtractTransformLoad` on synthetic CSV/XLSX sheets and `BankerMaster`
+against a local mock of the API, then reports rows/s, requests/s and
+request latency percentiles. The database is wiped between stages: point
+``--database`` at a throwaway database, never at production.
+
+    python -m benchmarks.run --rows 200000 --api-rows 2000 --latency 0.02
+    python -m benchmarks.run --baseline bench.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.mock_api import MockBankerMaster
+from benchmarks.synthetic import agreements_frame, owners_frame, write_frame
+
+THROUGHPUT_METRICS = ("rows_per_second", "requests_per_second")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", help="SQLAlchemy URL of a throwaway database (default: temporary SQLite file).")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows of each synthetic ETL sheet.")
+    parser.add_argument("--xlsx-rows", type=int, default=20000, help="Rows of the synthetic XLSX sheet.")
+    parser.add_argument("--api-rows", type=int, default=1000, help="CPFs sent through the API loops.")
+    parser.add_argument("--invalid-rate", type=float, default=0.02, help="Share of synthetic CPFs with a wrong check digit.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock API latency in seconds.")
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0, help="Share of mock API answers that are 401.")
+    parser.add_argument("--token-ttl", type=float, help="Lifetime in seconds of the mock API tokens (default: never expire).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock API answers that are 500.")
+    parser.add_argument("--concurrency", type=int, default=8, help="BankerMaster concurrency.")
+    parser.add_argument("--batch-size", type=int, default=500, help="BankerMaster write batch size.")
+    parser.add_argument("--rate", type=int, default=1000000, help="Requests per minute allowed by the rate limiter.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare throughput against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop versus the baseline (0.2 = 20%%).")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, mock: MockBankerMaster, workdir: str):
+    """
+    Point the application at the mock API and benchmark database; must run before importing any `src` module.
+    """
+    os.environ.update({
+        "DATABASE_URL": args.database or f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}",
+        "BASE_URL": mock.base_url,
+        "URL_TOKEN": f"{mock.base_url}/token",
+        "USERMASTER": "benchmark",
+        "MASTERPASSWORD": "benchmark",
+        "MASTER_RATE_SCHEDULE": f"default={args.rate}",
+        "MASTER_RATE_BURST": str(args.concurrency),
+        "MASTER_CACHE_TTL": "0",
+    })
+
+
+def wipe(database):
+    from src.models.apiresponse import Base
+
+    with database.engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
+def bench_etl(etl, path: str, financial_agreements: bool) -> dict:
+    file_type = os.path.splitext(path)[1].lstrip(".")
+    transformer = etl.ExtractTransformLoad(file_type=file_type, file_content=path, reject_path=path + ".rejected.csv")
+    started = time.perf_counter()
+    if financial_agreements:
+        rows = transformer.processing_dataframe_financialagreements()
+    else:
+        rows = transformer.processing_dataframe()
+    elapsed = time.perf_counter() - started
+    return {"rows": rows or 0, "seconds": round(elapsed, 3), "rows_per_second": round((rows or 0) / elapsed, 1)}
+
+
+def bench_api(mock: MockBankerMaster, run) -> dict:
+    from src.utils.http import get_session
+
+    latencies = []
+    lock = threading.Lock()
+
+    def record(response, *args, **kwargs):
+        with lock:
+            latencies.append(response.elapsed.total_seconds())
+
+    session = get_session()
+    session.hooks["response"].append(record)
+    before = sum(mock.counts.values())
+    started = time.perf_counter()
+    try:
+        run()
+    finally:
+        session.hooks["response"].remove(record)
+    elapsed = time.perf_counter() - started
+    requests = sum(mock.counts.values()) - before
+
+    result = {"requests": requests, "seconds": round(elapsed, 3), "requests_per_second": round(requests / elapsed, 1)}
+    if latencies:
+        result["p50_ms"] = round(float(np.percentile(latencies, 50)) * 1000, 2)
+        result["p99_ms"] = round(float(np.percentile(latencies, 99)) * 1000, 2)
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    List the throughput metrics that dropped more than `tolerance` below the baseline.
+    """
+    regressions = []
+    for stage, metrics in results.items():
+        for metric in THROUGHPUT_METRICS:
+            reference = baseline.get(stage, {}).get(metric)
+            if reference and metric in metrics and metrics[metric] < reference * (1 - tolerance):
+                regressions.append(f"{stage}.{metric}: {metrics[metric]} < {reference} (-{tolerance:.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="fast-spreed-bench-")
+    mock = MockBankerMaster(latency=args.latency, unauthorized_rate=args.unauthorized_rate, error_rate=args.error_rate, token_ttl=args.token_ttl)
+
+    with mock:
+        configure_environment(args, mock, workdir)
+        from src import botmaster, etl
+        from src.controllers.database import database
+        from src.utils.metrics import metrics
+
+        results = {}
+        owners_csv = write_frame(owners_frame(args.rows, args.invalid_rate), os.path.join(workdir, "owners.csv"))
+        owners_xlsx = write_frame(owners_frame(args.xlsx_rows, args.invalid_rate, seed=1), os.path.join(workdir, "owners.xlsx"))
+        agreements_csv = write_frame(agreements_frame(args.rows, args.invalid_rate, seed=2), os.path.join(workdir, "agreements.csv"))
+        api_csv = write_frame(owners_frame(args.api_rows, seed=3), os.path.join(workdir, "api.csv"))
+
+        wipe(database)
+        results["etl_csv"] = bench_etl(etl, owners_csv, financial_agreements=False)
+        results["etl_xlsx"] = bench_etl(etl, owners_xlsx, financial_agreements=False)
+        results["etl_agreements_csv"] = bench_etl(etl, agreements_csv, financial_agreements=True)
+
+        wipe(database)
+        bench_etl(etl, api_csv, financial_agreements=False)
+        banker = botmaster.BankerMaster(concurrency=args.concurrency, batch_size=args.batch_size)
+        results["search_id_convenio"] = bench_api(mock, lambda: banker.search_id_convenio(resume=False))
+        results["get_limit_users"] = bench_api(mock, lambda: banker.get_limit_users(resume=False))
+        results["mock_api"] = dict(mock.counts)
+        results["stages"] = metrics.snapshot()["stages"]
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
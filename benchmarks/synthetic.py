@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+def synthetic_cpfs(rows: int, invalid_rate: float = 0.0, seed: int = 0) -> pd.Series:
+    """
+    Generate formatted CPFs (``000.000.000-00``) with correct check digits.
+
+    Args:
+        rows (int): Number of CPFs.
+        invalid_rate (float): Share of CPFs whose last digit is corrupted.
+        seed (int): Random seed.
+    """
+    generator = np.random.default_rng(seed)
+    digits = generator.integers(0, 10, size=(rows, 11))
+    digits[:, 9] = (digits[:, :9] @ np.arange(10, 1, -1) * 10) % 11 % 10
+    digits[:, 10] = (digits[:, :10] @ np.arange(11, 1, -1) * 10) % 11 % 10
+
+    corrupt = generator.random(rows) < invalid_rate
+    digits[corrupt, 10] = (digits[corrupt, 10] + 1) % 10
+
+    text = pd.Series(["".join(map(str, row)) for row in digits])
+    return text.str[:3] + "." + text.str[3:6] + "." + text.str[6:9] + "-" + text.str[9:]
+
+
+def owners_frame(rows: int, invalid_rate: float = 0.0, seed: int = 0) -> pd.DataFrame:
+    """
+    Input sheet for `ExtractTransformLoad.processing_dataframe` (`cpf`, `CELULAR`).
+    """
+    generator = np.random.default_rng(seed + 1)
+    phones = generator.integers(10**10, 10**11, size=rows)
+    return pd.DataFrame({
+        "cpf": synthetic_cpfs(rows, invalid_rate, seed),
+        "CELULAR": [f"({str(phone)[:2]}) {str(phone)[2:7]}-{str(phone)[7:]}" for phone in phones],
+        "NOME": [f"Cliente {index}" for index in range(rows)],
+    })
+
+
+def agreements_frame(rows: int, invalid_rate: float = 0.0, seed: int = 0) -> pd.DataFrame:
+    """
+    Input sheet for `ExtractTransformLoad.processing_dataframe_financialagreements` (`CPF`, `id_convenio`).
+    """
+    generator = np.random.default_rng(seed + 2)
+    return pd.DataFrame({
+        "CPF": synthetic_cpfs(rows, invalid_rate, seed),
+        "id_convenio": generator.integers(100, 120, size=rows).astype(str),
+    })
+
+
+def write_frame(df: pd.DataFrame, path: str) -> str:
+    """
+    Save `df` as `;`-separated CSV or XLSX depending on the extension of `path`.
+    """
+    if path.endswith(".xlsx"):
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, sep=";", index=False)
+    return path
@@ -1,22 +1,152 @@
-from src.botmaster import BankerMaster
-from src.botmaster import ExtractTransformLoad
+import argparse
+import os
+import sys
+# Commands import `src.botmaster` / `src.etl` (pandas, requests, the database) only when they run.
 from src.controllers.datapaths import ManagePathDatabaseFiles
+from src.utils.metrics import PeriodicReporter, metrics, profiled
 from rich.console import Console
+from datetime import datetime
 
 console = Console()
 
+
+def parse_date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def parse_args(argv=None):
+    """
+    Argumentos da linha de comando; sem subcomando, `manage.py` abre o menu interativo.
+    """
+    parser = argparse.ArgumentParser(description="Automação Banco Master")
+    commands = parser.add_subparsers(dest="command")
+
+    etl = argparse.ArgumentParser(add_help=False)
+    etl.add_argument("files", nargs="*", help="Planilhas .csv/.xlsx (padrão: todas da pasta data, movidas para a lixeira depois).")
+    etl.add_argument("--with-convenio", action="store_true", help="As planilhas têm CPF e id_convenio em vez de cpf e CELULAR.")
+    etl.add_argument("--workers", type=int, help="Processos do ETL (padrão: ETL_WORKERS ou o número de CPUs).")
+    etl.add_argument("--etl-batch-size", type=int, default=10000, help="Linhas gravadas por transação no ETL.")
+    etl.add_argument("--chunk-size", type=int, default=100000, help="Linhas lidas de cada planilha por vez.")
+    etl.add_argument("--keep-files", action="store_true", help="Não mover as planilhas da pasta data para a lixeira.")
+
+    api = argparse.ArgumentParser(add_help=False)
+    api.add_argument("--concurrency", type=int, help="Requisições simultâneas (padrão: MASTER_CONCURRENCY ou 8).")
+    api.add_argument("--batch-size", type=int, help="Linhas gravadas por transação (padrão: MASTER_BATCH_SIZE ou 100).")
+    api.add_argument("--rate-schedule", help='Limite por minuto por horário, ex. "07:00-20:00=100,default=2000" (padrão: MASTER_RATE_SCHEDULE).')
+    api.add_argument("--restart", action="store_true", help="Recomeçar do zero em vez de retomar a execução anterior.")
+
+    incremental = argparse.ArgumentParser(add_help=False)
+    incremental.add_argument("--incremental", action="store_true", help="Pular planilhas já carregadas e consultar só CPFs novos ou com resposta antiga.")
+    incremental.add_argument("--max-age-days", type=float, help="Com --incremental, idade em dias a partir da qual uma resposta é consultada de novo (padrão: MASTER_MAX_AGE_DAYS ou 7).")
+
+    distributed = argparse.ArgumentParser(add_help=False)
+    distributed.add_argument("--distributed", action="store_true", help="Dividir as chaves com outros workers do mesmo banco.")
+
+    commands.add_parser("ingest", parents=[etl, incremental], help="Carregar planilhas no banco.")
+    commands.add_parser("search-convenios", parents=[api, incremental, distributed], help="Buscar os convênios dos CPFs carregados.")
+    commands.add_parser("limits", parents=[api, incremental, distributed], help="Consultar os limites dos CPFs com convênio.")
+    commands.add_parser("run-all", parents=[etl, api, incremental], help="ETL, convênios e limites em etapas encadeadas.")
+
+    export = commands.add_parser("export", help="Exportar api_responses para a pasta output.")
+    export.add_argument("--format", choices=("csv", "parquet", "xlsx"), default="csv")
+    export.add_argument("--since", type=parse_date, help="Data inicial AAAA-MM-DD.")
+    export.add_argument("--until", type=parse_date, help="Data final AAAA-MM-DD.")
+    export.add_argument("--id-convenio")
+
+    commands.add_parser("trash", help="Apagar os registros carregados.")
+    return parser.parse_args(argv)
+
+
+def input_files(args) -> list:
+    return args.files or ManagePathDatabaseFiles().list_all_files()
+
+
+def print_summaries(summaries: list):
+    for summary in summaries:
+        if summary.get("skipped"):
+            console.print(f"{summary['file']}: já carregada, ignorada", style="bold yellow")
+            continue
+        style = "bold green" if summary["ok"] else "bold red"
+        console.print(f"{summary['file']}: {summary['rows']} linhas em {summary['seconds']:.2f}s ({summary['rows_per_second']:.0f} linhas/s)", style=style)
+
+
+def trash_ingested(args, summaries: list):
+    """
+    Move para a lixeira as planilhas da pasta data carregadas com sucesso.
+    """
+    if not args.files and not args.keep_files:
+        ManagePathDatabaseFiles().move_trash_files(move_trash=True, files=[summary["file"] for summary in summaries if summary["ok"]])
+
+
+def banker_master(args):
+    from src.botmaster import BankerMaster
+
+    return BankerMaster(concurrency=args.concurrency, batch_size=args.batch_size, rate_schedule=args.rate_schedule, max_age_days=args.max_age_days)
+
+
+def run_command(args) -> int:
+    """
+    Executa um subcomando e devolve o código de saída.
+    """
+    if args.command == "ingest":
+        from src.etl import ingest_files
+
+        summaries = ingest_files(input_files(args), financial_agreements=args.with_convenio, workers=args.workers, batch_size=args.etl_batch_size, chunk_size=args.chunk_size, incremental=args.incremental)
+        print_summaries(summaries)
+        trash_ingested(args, summaries)
+        return 0 if all(summary["ok"] for summary in summaries) else 1
+
+    if args.command == "search-convenios":
+        banker_master(args).search_id_convenio(resume=not args.restart, distributed=args.distributed, incremental=args.incremental)
+    elif args.command == "limits":
+        banker_master(args).get_limit_users(resume=not args.restart, distributed=args.distributed, incremental=args.incremental)
+    elif args.command == "run-all":
+        summaries = banker_master(args).run_all(
+            input_files(args),
+            financial_agreements=args.with_convenio,
+            resume=not args.restart,
+            workers=args.workers,
+            batch_size=args.etl_batch_size,
+            chunk_size=args.chunk_size,
+            incremental=args.incremental,
+        )
+        print_summaries(summaries)
+        trash_ingested(args, summaries)
+        return 0 if all(summary["ok"] for summary in summaries) else 1
+    elif args.command == "export":
+        from src.botmaster import BankerMaster
+
+        file_path = BankerMaster().export_responses(file_format=args.format, since=args.since, until=args.until, id_convenio=args.id_convenio)
+        if not file_path:
+            return 1
+        console.print(f"Arquivo exportado: {file_path}", style="bold green")
+    elif args.command == "trash":
+        from src.controllers.trash import trash_records
+
+        trash_records(financial_agreements=True, generic_report=True, owners_cpf=True, loggers=True)
+    return 0
+
+
 if __name__ == "__main__":
         
     def interface():
         console.print("Automação Banco Master", style="bold green")
         while True:
             try:
-                option = console.input("[bold green]Escolha uma opção: [1]ETL [2]Banker Master [3]Apagar registros [4]Sair.. [/bold green]:")
+                option = console.input("[bold green]Escolha uma opção: [1]ETL [2]Banker Master [3]Apagar registros [4]Sair [5]Exportar respostas.. [/bold green]:")
                 if option == "1":
                 
                     console.print("Executando ETL...", style="bold green")
+                    from src.etl import ExtractTransformLoad, ingest_files
                     financialAgreements = input("Deseja processar dataframe sem convenio? (S/N): ")
-                    if financialAgreements.upper() == "S":
+                    allFiles = input("Processar todos os arquivos da pasta data em paralelo? (S/N): ")
+                    if allFiles.upper() == "S":
+                        incremental = input("Pular planilhas já carregadas? (S/N): ").upper() == "S"
+                        paths = ManagePathDatabaseFiles()
+                        summaries = ingest_files(paths.list_all_files(), financial_agreements=financialAgreements.upper() != "S", incremental=incremental)
+                        print_summaries(summaries)
+                        paths.move_trash_files(move_trash=True, files=[summary["file"] for summary in summaries if summary["ok"]])
+                    elif financialAgreements.upper() == "S":
                         files = ManagePathDatabaseFiles().list_files_database()
                         transformer = ExtractTransformLoad(file_content=files, file_type="xlsx")
                         transformer.processing_dataframe()
@@ -28,25 +158,52 @@ if __name__ == "__main__":
                 
                 elif option == "2":
                     console.print("Executando Banker Master...", style="bold green")
+                    from src.botmaster import BankerMaster
                     transformer = input("[bold green]Deseja buscar convenios? (S/N): [/bold green]")
+                    resume = input("Retomar a execução anterior? (S/N): ").upper() != "N"
+                    distributed = input("Dividir os CPFs com outros workers? (S/N): ").upper() == "S"
+                    incremental = input("Consultar só CPFs novos ou com resposta antiga? (S/N): ").upper() == "S"
                     if transformer.upper() == "S":
                         banker_master = BankerMaster()
-                        banker_master.search_id_convenio()
-                        banker_master.get_limit_users() # get limit continue
+                        banker_master.search_id_convenio(resume=resume, distributed=distributed, incremental=incremental)
+                        banker_master.get_limit_users(resume=resume, distributed=distributed, incremental=incremental) # get limit continue
                     elif transformer.upper() == "N":
                         banker_master = BankerMaster()
-                        banker_master.get_limit_users()
+                        banker_master.get_limit_users(resume=resume, distributed=distributed, incremental=incremental)
                 
                 elif option == "3":
                     console.print("Apagando registros...", style="bold green")
-                    banker_master = BankerMaster()
-                    banker_master.trash(financial_agreements=True, generic_report=True, owners_cpf=True, loggers=True)
+                    from src.controllers.trash import trash_records
+                    trash_records(financial_agreements=True, generic_report=True, owners_cpf=True, loggers=True)
 
                 elif option == "4":
                     break
+
+                elif option == "5":
+                    console.print("Exportando respostas...", style="bold green")
+                    from src.botmaster import BankerMaster
+                    file_format = input("Formato (csv/parquet/xlsx): ").strip().lower() or "csv"
+                    since = input("Data inicial AAAA-MM-DD (vazio para todas): ").strip()
+                    id_convenio = input("id_convenio (vazio para todos): ").strip()
+                    file_path = BankerMaster().export_responses(
+                        file_format=file_format,
+                        since=datetime.strptime(since, "%Y-%m-%d") if since else None,
+                        id_convenio=id_convenio or None,
+                    )
+                    if file_path:
+                        console.print(f"Arquivo exportado: {file_path}", style="bold green")
                 else:
                     console.print("Opcão inválida. Tente novamente.", style="bold red")
             except Exception as e:
                 console.print(f"Erro ao executar a opção escolhida: {e}", style="bold red")
 
-    interface()
\ No newline at end of file
+    args = parse_args()
+    exit_code = 0
+    with profiled(os.getenv("PROFILE"), os.getenv("PROFILE_OUTPUT")), PeriodicReporter(interval=float(os.getenv("METRICS_INTERVAL", "60"))):
+        if args.command:
+            exit_code = run_command(args)
+        else:
+            interface()
+    if os.getenv("METRICS_DUMP"):
+        metrics.dump(os.getenv("METRICS_DUMP"))
+    sys.exit(exit_code)
@@ -1,341 +1,484 @@
+import multiprocessing
 import os
-import pandas as pd
-import requests
+import socket
+import threading
 import time
 
+import requests
+
 from tqdm import tqdm
-from src.utils.log import setup_logger
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine, desc
+from src.utils.log import EventAggregator, setup_logger
+from src.controllers.checkpoint import CheckpointStore
+from src.controllers.database import database
+from src.controllers.datapaths import ManagePathDatabaseFiles
+from src.controllers.token import TokenManager
+from src.controllers.trash import trash_records
+from src.controllers.writer import BufferedWriter
+from src.utils.cache import ResponseCache, default_cache
+from src.utils.concurrency import imap_unordered
+from src.utils.http import RETRY_STATUSES, backoff_delay, get_session, http_retries, http_timeout
+from src.utils.metrics import metrics
+from src.utils.ratelimit import DEFAULT_SCHEDULE, RateSchedule, TokenBucket, retry_after_seconds
+from src.utils.responses import limits_frame
 from src.models.apiresponse import (APIResponse, 
-    Base, DATABASE_URL, Loggger, User, UserFinancialAgreements, ReportGeneric
+    User, UserFinancialAgreements, ReportGeneric
 )
+from sqlalchemy import exists
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
 
-engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+Session = database.session
 
 load_dotenv()
 
 logger = setup_logger(__name__)
 
-class ExtractTransformLoad:
-    
-    def __init__(self, file_type: str, file_content: str):
-        """
-        Initialize an ExtractTransformLoad object.
-
-        Args:
-            file_type (str): The type of file. Valid options are 'csv' and 'xlsx'.
-            file_content (str): The content of the file to be processed.
-        """
-        self.file_type = file_type
-        self.file_content = file_content
-    
-    def processing_dataframe(self) :
-        """
-            Processing dataframe capturation `CPF` not in `convenio_id`
-        Args:
-            file_content (_type_): str
-            file_type (_type_): str
-        """
-        session = Session()
-        try:
-            if self.file_type == 'csv':
-                df = pd.read_csv(self.file_content, sep=";", dtype="object")
-            elif self.file_type == 'xlsx':
-                df = pd.read_excel(self.file_content, dtype="object")
-            else:
-                logger.info("Please provide a valid CSV or XLSX file.")
-                return
-
-            for index, row in tqdm(df.iterrows(), total=len(df)):
-                cpf = row["cpf"].replace(".", "").replace("-", "")
-                phone = row["CELULAR"]                 
-                user = User(cpf=cpf, phone=phone)
-                session.add(user)
-                session.commit()
-            logger.warning("Successfully saved CPFs to the database.")
-        except Exception as e:
-            logger.error(f"Error processing file: {e}", exc_info=True)
-        finally:
-            session.close()
+class UserAgentsRequests:
 
-    def processing_dataframe_financialagreements(self):
+    def __init__(self, limiter: TokenBucket = None, max_throttle_retries: int = 3, http=None, cache: ResponseCache = None, refresh_cache: bool = False, max_retries: int = None):
         """
-            Processing dataframe capturation `CPF` with `convenio_id`
         Args:
-            file_content (_type_): str
-            file_type (_type_): str
+            limiter (TokenBucket): Shared rate limiter. Defaults to one built from `MASTER_RATE_SCHEDULE`.
+            max_throttle_retries (int): Times a 429 response is retried after its `Retry-After` pause.
+            max_retries (int): Times a read error or 5xx answer is retried with backoff. Defaults to `MASTER_HTTP_RETRIES` or 3.
+            http (requests.Session): Pooled session to send requests with. Defaults to the shared one.
+            cache (ResponseCache): Cache consulted before each keyed request; None disables caching.
+            refresh_cache (bool): Skip cached answers but still store the new ones, for runs started over.
         """
-        session = Session()
-        try:
-            if self.file_type == 'csv':
-                df = pd.read_csv(self.file_content, sep=";", dtype="object")
-            elif self.file_type == 'xlsx':
-                df = pd.read_excel(self.file_content, dtype="object")
-            else:
-                logger.info("Please provide a valid CSV or XLSX file.")
-                return
-            
-            for index, row in tqdm(df.iterrows(), total=len(df)):
-                cpf = row["CPF"]
-                id_convenio = row["id_convenio"]
-
-                user = UserFinancialAgreements(cpf=cpf, id_convenio=id_convenio)
-                session.add(user)
-                session.commit()
-
-            logger.warning("Successfully saved CPFs with id_convenio to the database.")
-        except Exception as e:
-            logger.error(f"Error processing file: {e}", exc_info=True)
-        finally:
-            session.close()
-
-class UserAgentsRequests:
+        self.limiter = limiter or TokenBucket(
+            RateSchedule.parse(os.getenv("MASTER_RATE_SCHEDULE", DEFAULT_SCHEDULE)),
+            burst=int(os.getenv("MASTER_RATE_BURST", "1")),
+        )
+        self.max_throttle_retries = max_throttle_retries
+        retries, self.backoff_factor = http_retries()
+        self.max_retries = retries if max_retries is None else max_retries
+        self.http = http or get_session()
+        self.timeout = http_timeout()
+        self.cache = cache
+        self.refresh_cache = refresh_cache
 
-    def __init__(self):
-        self.request_count = 0
-        self.last_reset_time = time.time()
-
-    def agente_request(self, url: str, headers: dict):
+    def agente_request(self, url: str, headers: dict, cache_key: str = None):
         """
         Check the status code of the token request response.
 
         :param url: URL da requisição.
-        :param payload: Dados a serem enviados na requisição.
         :param headers: Cabeçalhos da requisição.
-        :param method: Método HTTP (GET, POST, etc.).
+        :param cache_key: Chave do endpoint + CPF (+ convênio) para reutilizar respostas em cache.
         """
         try:
-            current_time = datetime.now().time()
-            if current_time >= datetime.strptime('07:00', '%H:%M').time() and current_time <= datetime.strptime('20:00', '%H:%M').time():
-                max_requests_per_minute = 100
-            else:
-                max_requests_per_minute = 2000
+            if self.cache and cache_key and not self.refresh_cache:
+                try:
+                    cached = self.cache.get(cache_key)
+                except Exception as e:
+                    metrics.incr("cache_errors")
+                    logger.warning(f"Could not read the response cache, querying the API: {e}")
+                    cached = None
+                if cached is not None:
+                    metrics.incr("cache_hits")
+                    return cached
+                metrics.incr("cache_misses")
 
-            if self.request_count >= max_requests_per_minute:
-                elapsed_time = time.time() - self.last_reset_time
-                if elapsed_time < 60:
-                    sleep_time = 60
-                    logger.info(f"Rate limit reached. Sleeping for {sleep_time} seconds.")
-                    time.sleep(sleep_time)
-                self.request_count = 0
-                self.last_reset_time = time.time()
-
-            response = requests.get(url, headers=headers)
-            self.request_count += 1
+            # Every attempt, retries included, takes a token: the API counts them all.
+            throttled = retried = 0
+            while True:
+                waited = self.limiter.acquire()
+                if waited:
+                    metrics.observe("rate_limit_sleep", waited)
+                try:
+                    with metrics.stage("http_wait"):
+                        response = self.http.get(url, headers=headers, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                    metrics.incr("requests")
+                    if retried >= self.max_retries:
+                        raise
+                    retried += 1
+                    metrics.incr("retries")
+                    time.sleep(backoff_delay(retried, self.backoff_factor))
+                    continue
+                metrics.incr("requests")
+                if response.status_code == 429:
+                    metrics.incr("responses_429")
+                if response.status_code == 429 and throttled < self.max_throttle_retries:
+                    throttled += 1
+                    pause = retry_after_seconds(response.headers.get("Retry-After"), default=10.0)
+                    logger.info(f"Rate limited by the API. Pausing requests for {pause:.1f} seconds.")
+                    self.limiter.pause(pause)
+                    continue
+                if response.status_code in RETRY_STATUSES and retried < self.max_retries:
+                    retried += 1
+                    metrics.incr("retries")
+                    time.sleep(backoff_delay(retried, self.backoff_factor))
+                    continue
+                break
 
             if response.status_code == 200:
-                return response.json()
+                payload = response.json()
+                if self.cache and cache_key:
+                    try:
+                        self.cache.set(cache_key, payload)
+                    except Exception as e:
+                        # The answer is good; only its cached copy is lost (e.g. `cache.sqlite` locked by another worker).
+                        metrics.incr("cache_errors")
+                        logger.warning(f"Could not cache a response: {e}")
+                return payload
             elif response.status_code == 401:
+                metrics.incr("responses_401")
                 return {'message': 'Unauthorized'}
             else:
+                metrics.incr("errors")
                 logger.error(f"Failed to fetch data. Status: {response.status_code}")
                 return response.json()
 
         except Exception as e:
+            metrics.incr("errors")
             logger.error(f"Error processing file: {e}", exc_info=True)
             return None
 
 class BankerMaster:
-    def __init__(self):
+    def __init__(self, concurrency: int = None, batch_size: int = None, worker_id: str = None, rate_schedule: str = None, max_age_days: float = None):
         """
         Initialize a BankerMaster object.
+
+        Credentials (`USERMASTER`, `MASTERPASSWORD`) and the rate budget
+        (`MASTER_RATE_SCHEDULE`) come from the environment, so each worker of
+        a distributed run can use its own.
+
+        Args:
+            concurrency (int): API requests kept in flight at once. Defaults to `MASTER_CONCURRENCY` or 8.
+            batch_size (int): Result rows committed per transaction. Defaults to `MASTER_BATCH_SIZE` or 100.
+            worker_id (str): Name of this worker in distributed runs. Defaults to `MASTER_WORKER_ID` or host:pid.
+            rate_schedule (str): Requests per minute by time of day, shared by every stage. Defaults to `MASTER_RATE_SCHEDULE`.
+            max_age_days (float): In incremental runs, answers older than this are queried again. Defaults to `MASTER_MAX_AGE_DAYS` or 7.
         """
         self.url_token = os.getenv("URL_TOKEN")
         self.payload_token = {"usuario": os.getenv("USERMASTER"), "senha": os.getenv("MASTERPASSWORD")}
         self.base_url = os.getenv("BASE_URL")
-        self.token = None
-    
-    def refresh_token(self):
+        self.concurrency = concurrency or int(os.getenv("MASTER_CONCURRENCY", "8"))
+        self.batch_size = batch_size or int(os.getenv("MASTER_BATCH_SIZE", "100"))
+        self.worker_id = worker_id or os.getenv("MASTER_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+        self.claim_size = int(os.getenv("MASTER_CLAIM_SIZE", "500"))
+        self.lease_seconds = float(os.getenv("MASTER_LEASE_SECONDS", "600"))
+        self.max_age = timedelta(days=max_age_days or float(os.getenv("MASTER_MAX_AGE_DAYS", "7")))
+        # run_all keeps two API stages of `concurrency` requests in flight on this session.
+        self.http = get_session(pool_size=self.concurrency * 2)
+        self.cache = default_cache()
+        self.limiter = TokenBucket(
+            RateSchedule.parse(rate_schedule or os.getenv("MASTER_RATE_SCHEDULE", DEFAULT_SCHEDULE)),
+            burst=int(os.getenv("MASTER_RATE_BURST", "1")),
+        )
+        self.tokens = TokenManager(
+            fetch=self.request_token,
+            session_factory=Session,
+            slot=f"banco_master:{self.payload_token['usuario']}",
+            refresh_margin=float(os.getenv("MASTER_TOKEN_REFRESH_MARGIN", "60")),
+        )
+
+    def request_token(self):
         """
-        Fetches a new authentication token and updates self.token.
+        Request a new authentication token from the API.
+
+        Returns:
+            tuple: ``(token, expires_in)``, or None if the request failed.
         """
-        session = Session()
         try:
-            response = requests.post(url=self.url_token, json=self.payload_token)
+            with metrics.stage("token_refresh"):
+                response = self.http.post(url=self.url_token, json=self.payload_token, timeout=http_timeout())
+            metrics.incr("token_refreshes")
             if response.status_code == 200:
-                new_token = response.json().get("accessToken")
+                body = response.json()
+                new_token = body.get("accessToken")
                 if new_token:
-                    self.token = new_token  # Atualiza o token na instância
-                    log_entry = Loggger(message=new_token, exception=None)
-                    session.add(log_entry)
-                    session.commit()
                     logger.info("Token successfully refreshed.")
-                else:
-                    logger.error("Token refresh response did not contain an access token.")
+                    return new_token, body.get("expiresIn")
+                logger.error("Token refresh response did not contain an access token.")
             else:
                 logger.error(f"Failed to fetch token. Status: {response.status_code}")
-
         except Exception as e:
             logger.error(f"Error processing token refresh: {e}", exc_info=True)
-        finally:
-            session.close()
+        return None
+
+    def refresh_token(self):
+        """
+        Fetches a new authentication token now, regardless of the current one's expiry.
+        """
+        return self.tokens.refresh()
     
     def auth_headers(self):
         """
         Returns the authentication headers containing the Bearer token.
-        If the token is not available, it will fetch it from the database or refresh it.
+        The token manager recovers it from its persisted slot or refreshes it when missing or about to expire.
         """
-        if not self.token:
-            session = Session()
-            try:
-                last_log = session.query(Loggger).order_by(desc(Loggger.created_at)).first()
-                if last_log:
-                    self.token = last_log.message
-                    logger.info("Token successfully recovered from the database.")
+        return {"Authorization": f"Bearer {self.tokens.get()}", "User-Agent": "ASHER"}
+
+    def renew_token(self, stale_token: str):
+        """
+        Replace a token rejected with 401, once for all workers.
+        """
+        self.tokens.invalidate(stale_token)
+
+    def request_with_token(self, agents_requests: UserAgentsRequests, url: str, cache_key: str = None, max_retries: int = 2, events: EventAggregator = None):
+        """
+        Request `url`, renewing the token and retrying when the API answers 401.
+
+        401s are counted in `events` (their URL, which holds the CPF, only at DEBUG).
+        """
+        response = None
+        for _ in range(max_retries):
+            headers = self.auth_headers()
+            response = agents_requests.agente_request(url=url, headers=headers, cache_key=cache_key)
+            if isinstance(response, dict) and response.get("message") == "Unauthorized":
+                detail = f"Unauthorized for {url}. Refreshing token..."
+                if events is not None:
+                    events.record("unauthorized", detail)
                 else:
-                    logger.warning("Token not found in the database. Fetching a new one.")
-                    self.refresh_token()  # Atualiza o token diretamente
-            except Exception as e:
-                logger.error(f"Error retrieving token from the database: {e}", exc_info=True)
-            finally:
-                session.close()
-        
-        return {"Authorization": f"Bearer {self.token}", "User-Agent": "ASHER"}
+                    logger.debug(detail)
+                self.renew_token(stale_token=headers["Authorization"].removeprefix("Bearer "))
+                continue
+            break
+        return response
+
+    def checkpoints(self, stage: str, distributed: bool = False):
+        """
+        Checkpoint store of `stage`, leasing its keys under `worker_id` in distributed and pipelined runs.
+        """
+        if distributed:
+            return CheckpointStore(stage, worker=self.worker_id, lease_seconds=self.lease_seconds)
+        return CheckpointStore(stage)
+
+    def pending_keys(self, session, checkpoints: CheckpointStore, resume: bool, distributed: bool, seed=None, upstream_done: threading.Event = None):
+        """
+        Keys still to query: claimed in leased batches when distributed, streamed otherwise.
+
+        With `upstream_done`, keys are followed as the previous pipeline stage
+        produces them (see `CheckpointStore.follow`).
+        """
+        if upstream_done is not None:
+            return checkpoints.follow(session, seed, upstream_done, batch_size=self.claim_size)
+        if distributed:
+            if not resume:
+                logger.warning("Distributed runs always resume; reset the checkpoints from a single process to start over.")
+            return checkpoints.claimed(session, batch_size=self.claim_size)
+        return checkpoints.remaining(session)
+
+    def expire_stale(self, session, checkpoints: CheckpointStore):
+        """
+        Queue again the keys of `checkpoints` answered more than `max_age` ago, returning the cutoff.
+        """
+        cutoff = checkpoints.cutoff(session, self.max_age)
+        expired = checkpoints.expire(session, cutoff)
+        logger.info(f"Incremental run: {expired} {checkpoints.stage} keys answered more than {self.max_age.days} days ago queued again.")
+        return cutoff
+
+    def writer(self, checkpoints: CheckpointStore):
+        """
+        Buffered writer committing result rows together with the checkpoints that produced them.
+        """
+        return BufferedWriter(
+            Session,
+            batch_size=self.batch_size,
+            flush_interval=float(os.getenv("MASTER_FLUSH_INTERVAL", "5")),
+            hooks=[checkpoints.apply, checkpoints.renew],
+            on_drop=[checkpoints.fail],
+            upserts={UserFinancialAgreements.__table__: False, APIResponse.__table__: True},
+            mappers={APIResponse.__table__: limits_frame},
+        )
 
-    def search_id_convenio(self):
+    def search_id_convenio(self, resume: bool = True, distributed: bool = False, upstream_done: threading.Event = None, incremental: bool = False):
+        """
+        Query the convenios of every CPF in `owners_cpf` and save them to `financial_agreements`.
+
+        Args:
+            resume (bool): Continue the previous run, skipping CPFs already answered; False starts over, querying the API again instead of reusing cached answers.
+            distributed (bool): Share the CPFs with other workers running the same stage, claiming them in leased batches.
+            upstream_done (threading.Event): Follow CPFs as they are loaded until this is set, instead of stopping at the current ones.
+            incremental (bool): Only query new or stale CPFs: answers older than `max_age` are queued again, and
+                CPFs with a convenio saved within `max_age` are never queued. Queued CPFs skip the response cache,
+                whose answers may be older than `max_age`.
+        """
         session = Session()
-        agents_requests = UserAgentsRequests()
+        agents_requests = UserAgentsRequests(limiter=self.limiter, http=self.http, cache=self.cache, refresh_cache=not resume or incremental)
+        checkpoints = self.checkpoints("convenio", distributed or upstream_done is not None)
+        events = EventAggregator(logger)
+
+        def consult(cpf):
+            url = f"{self.base_url}/consignado/v1/cliente/consulta-cpf?cpfRequest={cpf}"
+            return cpf, self.request_with_token(agents_requests, url, cache_key=f"consulta-cpf:{cpf}", events=events)
         
         try:
-            cpfs = session.query(User.cpf).all()
-            for cpf in tqdm(cpfs, desc="Processing CPFs"):
-                self.cpf = cpf[0]
-                url = f"{self.base_url}/consignado/v1/cliente/consulta-cpf?cpfRequest=47795867120"
-
-                max_retries = 2
-                attempts = 0  
+            if not resume and not distributed:
+                checkpoints.reset(session)
+            known = None
+            if incremental:
+                cutoff = self.expire_stale(session, checkpoints)
+                known = exists().where(
+                    UserFinancialAgreements.cpf == User.cpf,
+                    UserFinancialAgreements.created_at >= cutoff,
+                )
 
-                while attempts < max_retries:
-                    response = agents_requests.agente_request(url=url, headers=self.auth_headers())
+            def seed():
+                return checkpoints.seed(session, User.cpf, skip=known)
 
+            seed()
+            total = None if upstream_done else checkpoints.count_remaining(session)
+            keys = self.pending_keys(session, checkpoints, resume, distributed, seed=seed, upstream_done=upstream_done)
+            cpfs = (cpf for cpf, _ in keys)
+            results = imap_unordered(consult, cpfs, self.concurrency)
+            with self.writer(checkpoints) as writer:
+                for cpf, response in tqdm(results, total=total, desc="Processing CPFs"):
                     if response is not None and isinstance(response, list):
                         for item in response:
                             id_convenio = item.get("idConvenio")                    
                             if id_convenio:
-                                user = UserFinancialAgreements(cpf=self.cpf, id_convenio=id_convenio)
-                                session.add(user)
-                                session.commit()
-                                tqdm.write(f"Successfully saved CPF {self.cpf} with id_convenio {id_convenio} to the database.")
+                                writer.add(UserFinancialAgreements.__table__, {"cpf": cpf, "id_convenio": id_convenio}, key=(cpf, None))
+                                events.record("convenios_saved", f"Successfully saved CPF {cpf} with id_convenio {id_convenio} to the database.")
                             else:
-                                tqdm.write(f"idConvenio not found in response for CPF {self.cpf}.")
-                                session.add(ReportGeneric(cpf=self.cpf, message=f"{response}", id_convenio=None))
-                                session.commit()
-                        break
-                    
-                    elif isinstance(response, dict) and response.get("message") == "Unauthorized":
-                        tqdm.write(f"Unauthorized for CPF {self.cpf}. Refreshing token...")
-                        self.trash(generic_report=False, financial_agreements=False, owners_cpf=False, loggers=True)
-                        self.refresh_token()
-                        attempts += 1
-
+                                events.record("convenios_missing", f"idConvenio not found in response for CPF {cpf}.")
+                                writer.add(ReportGeneric.__table__, {"cpf": cpf, "message": f"{response}", "id_convenio": None}, key=(cpf, None))
                     else:
-                        tqdm.write(f"Failed to fetch data for CPF {self.cpf}.")
-                        session.add(ReportGeneric(cpf=self.cpf, message=f"{response}", id_convenio=None))
-                        session.commit()
-                        break 
+                        events.record("failures", f"Failed to fetch data for CPF {cpf}.")
+                        writer.add(ReportGeneric.__table__, {"cpf": cpf, "message": f"{response}", "id_convenio": None}, key=(cpf, None))
+                    checkpoints.record(cpf, None, ok=isinstance(response, list), error=f"{response}")
+                    writer.maybe_flush(pending=len(checkpoints))
+            if self.cache:
+                logger.info(f"Response cache: {self.cache.stats()}")
         except Exception as e:
-            tqdm.write(f"Error processing file: {e}")
+            logger.error(f"Error processing file: {e}", exc_info=True)
         finally:
+            events.flush()
             session.close()
 
-    def get_limit_users(self):
+    def get_limit_users(self, resume: bool = True, distributed: bool = False, upstream_done: threading.Event = None, incremental: bool = False):
         """
         Processing each line of the database and saving the user limits to the database.
+
+        Up to `concurrency` limit queries run at once; results are written in bulk batches of `batch_size`.
+
+        Args:
+            resume (bool): Continue the previous run, skipping keys already answered; False starts over, querying the API again instead of reusing cached answers.
+            distributed (bool): Share the keys with other workers running the same stage, claiming them in leased batches.
+            upstream_done (threading.Event): Follow convenios as they are found until this is set, instead of stopping at the current ones.
+            incremental (bool): Only query new or stale keys: answers older than `max_age` are queued again, and
+                keys with a limit saved within `max_age` are never queued. Queued keys skip the response cache,
+                whose answers may be older than `max_age`.
         """
         session = Session()
-        agents_requests = UserAgentsRequests()
+        agents_requests = UserAgentsRequests(limiter=self.limiter, http=self.http, cache=self.cache, refresh_cache=not resume or incremental)
+        checkpoints = self.checkpoints("limit", distributed or upstream_done is not None)
+        events = EventAggregator(logger)
+
+        def consult(owner):
+            cpf, id_convenio = owner
+            url = f"{self.base_url}/consignado/v1/limite/consultar/{cpf}/{id_convenio}"
+            return cpf, id_convenio, self.request_with_token(agents_requests, url, cache_key=f"limite:{cpf}:{id_convenio}", events=events)
 
         try:
-            owners = session.query(UserFinancialAgreements).all()
-            
-            for owner in tqdm(owners, desc="Consult limit for cpf"):
-                cpf = owner.cpf
-                id_convenio = owner.id_convenio
-                url = f"{self.base_url}/consignado/v1/limite/consultar/{cpf}/{id_convenio}"                
-                
-                max_retries = 2  # Número máximo de reprocessamentos
-                attempts = 0  
-
-                while attempts < max_retries:
-                    response = agents_requests.agente_request(url=url, headers=self.auth_headers())
+            if not resume and not distributed:
+                checkpoints.reset(session)
+            known = None
+            if incremental:
+                cutoff = self.expire_stale(session, checkpoints)
+                known = exists().where(
+                    APIResponse.cpf == UserFinancialAgreements.cpf,
+                    APIResponse.id_convenio == UserFinancialAgreements.id_convenio,
+                    APIResponse.updated_at >= cutoff,
+                )
+
+            def seed():
+                return checkpoints.seed(session, UserFinancialAgreements.cpf, UserFinancialAgreements.id_convenio, skip=known)
 
+            seed()
+            total = None if upstream_done else checkpoints.count_remaining(session)
+            owners = self.pending_keys(session, checkpoints, resume, distributed, seed=seed, upstream_done=upstream_done)
+            results = imap_unordered(consult, owners, self.concurrency)
+            with self.writer(checkpoints) as writer:
+                for cpf, id_convenio, response in tqdm(results, total=total, desc="Consult limit for cpf"):
                     if response is not None and isinstance(response, list):
                         for item in response:
-                            limit = APIResponse(
-                                cpf=item.get("cpf"),
-                                nome=item.get("nome"),
-                                id_convenio=item.get("idConvenio"),
-                                matricula=item.get("matricula"),
-                                vl_multiplo_saque=item.get("vlMultiploSaque"),
-                                limite_utilizado=item.get("limiteUtilizado"),
-                                limite_total=item.get("limiteTotal"),
-                                limite_disponivel=item.get("limiteDisponivel"),
-                                vl_limite_parcela=item.get("vlLimiteParcela"),
-                                limite_parcela_utilizado=item.get("limiteParcelaUtilizado"),
-                                limite_parcela_disponivel=item.get("limiteParcelaDisponivel"),
-                                vl_margem=item.get("vlMargem"),
-                                vl_multiplo_compra=item.get("vlMultiploCompra"),
-                                vl_limite_compra=item.get("vlLimiteCompra"),
-                                cd_banco=item.get("cdBanco"),
-                                cd_agencia=item.get("cdAgencia"),
-                                cd_conta=item.get("cdConta"),
-                                nao_perturbe=item.get("naoPerturbe"),
-                                saque_complementar=item.get("saqueComplementar"),
-                                refinanciamento=item.get("contratoRefinanciamento", {}).get("refinanciamento"),
-                                numero_contrato=item.get("contratoRefinanciamento", {}).get("numeroContratos"),
-                                vlMaximoParcelas=item.get("contratoRefinanciamento", {}).get("vlMaximoParcela"),
-                                vlContrato=item.get("contratoRefinanciamento", {}).get("valor")
-                            )
-                            session.add(limit)
-                            session.commit()
-                            tqdm.write(f"Successfully saved limit for CPF {cpf}.")
-                        break  # Sai do loop se a requisição for bem-sucedida
-                    
-                    elif isinstance(response, dict) and response.get("message") == "Unauthorized":
-                        tqdm.write(f"Unauthorized for CPF {cpf}. Refreshing token...")
-                        self.trash(generic_report=False, financial_agreements=False, owners_cpf=False, loggers=True)
-                        self.refresh_token()  # Renova o token
-                        attempts += 1  # Incrementa a tentativa e reprocessa
-
+                            writer.add(APIResponse.__table__, item, key=(cpf, id_convenio))
+                            events.record("limits_saved", f"Successfully saved limit for CPF {cpf}.")
                     else:
-                        tqdm.write(f"Failed to fetch data for CPF {cpf}.")
-                        session.add(ReportGeneric(cpf=cpf, message=f"{response}", id_convenio=id_convenio))
-                        session.commit()
-                        break  # Sai do loop se não for erro de autenticação
+                        events.record("failures", f"Failed to fetch data for CPF {cpf}.")
+                        writer.add(ReportGeneric.__table__, {"cpf": cpf, "message": f"{response}", "id_convenio": id_convenio}, key=(cpf, id_convenio))
+                    checkpoints.record(cpf, id_convenio, ok=isinstance(response, list), error=f"{response}")
+                    writer.maybe_flush(pending=len(checkpoints))
+            if self.cache:
+                logger.info(f"Response cache: {self.cache.stats()}")
         except Exception as e:
-            tqdm.write(f"Error processing file: {e}")
+            logger.error(f"Error processing file: {e}", exc_info=True)
         finally:
+            events.flush()
             session.close()
 
-    def trash(self, generic_report: bool, financial_agreements: bool, owners_cpf: bool, loggers: bool):
-        session = Session()        
+    def run_all(self, files: list, financial_agreements: bool = False, resume: bool = True, workers: int = None, batch_size: int = 10000, chunk_size: int = 100000, incremental: bool = False) -> list:
+        """
+        Ingest `files`, search convenios and query limits as connected stages.
+
+        Each stage runs in its own thread and follows the rows the previous one
+        commits, so convenio searches start with the first loaded chunk and
+        limit queries with the first convenios found. Files that already carry
+        `id_convenio` go straight to the limit queries.
+
+        Args:
+            files (list): Input files to load.
+            financial_agreements (bool): The files hold `CPF`/`id_convenio` rows instead of `cpf`/`CELULAR`.
+            resume (bool): Continue the previous run of the API stages; False starts them over.
+            workers (int): ETL processes. Defaults to `ETL_WORKERS` or the CPU count.
+            batch_size (int): Rows written per ETL transaction.
+            chunk_size (int): Rows read from each file at a time.
+            incremental (bool): Skip files already ingested and query only new or stale keys.
+
+        Returns:
+            list: One ingest summary per file.
+        """
+        ingested = threading.Event()
+        convenios_found = threading.Event()
+        summaries = []
+
+        from src.etl import ingest_files
+
+        def ingest():
+            try:
+                # The API stages are already running: forking now could copy their held locks (tqdm, pools) into the workers.
+                summaries.extend(ingest_files(files, financial_agreements, workers, batch_size, chunk_size, mp_context=multiprocessing.get_context("spawn"), incremental=incremental))
+            except Exception as e:
+                logger.error(f"Error ingesting files: {e}", exc_info=True)
+            finally:
+                ingested.set()
+
+        def search():
+            try:
+                self.search_id_convenio(resume=resume, upstream_done=ingested, incremental=incremental)
+            finally:
+                convenios_found.set()
+
+        stages = [threading.Thread(target=ingest, name="stage-ingest")]
+        if not financial_agreements:
+            stages.append(threading.Thread(target=search, name="stage-convenio"))
+        for stage in stages:
+            stage.start()
+        self.get_limit_users(resume=resume, upstream_done=ingested if financial_agreements else convenios_found, incremental=incremental)
+        for stage in stages:
+            stage.join()
+        return summaries
+
+    def export_responses(self, file_format: str = "csv", since: datetime = None, until: datetime = None, id_convenio: str = None):
+        """
+        Export `api_responses` to the `output` directory as CSV, Parquet or XLSX.
+
+        Returns:
+            str: Path of the exported file, or None if the export failed.
+        """
         try:
-            if generic_report:
-                session.query(ReportGeneric).delete()
-                session.commit()
-                logger.info("Report deleted successfully.")
-            
-            elif financial_agreements:
-                session.query(UserFinancialAgreements).delete()
-                session.commit()
-                logger.info("User FinancialAgreements deleted successfully.")
-            
-            elif owners_cpf:
-                session.query(User).delete()
-                session.commit()
-                logger.info("User deleted successfully.")
-                
-            elif loggers:
-                session.query(Loggger).delete()
-                session.commit()
-                logger.info("Loggers deleted successfully.")
-            
+            from src.controllers.export import ExportApiResponses
+
+            exporter = ExportApiResponses(database.engine, ManagePathDatabaseFiles().output_path)
+            return exporter.export(file_format=file_format, since=since, until=until, id_convenio=id_convenio)
         except Exception as e:
-            logger.error(f"Error processing file: {e}", exc_info=True)
-        finally:
-            session.close()
\ No newline at end of file
+            logger.error(f"Error exporting api_responses: {e}", exc_info=True)
+            return None
+
+    def trash(self, generic_report: bool, financial_agreements: bool, owners_cpf: bool, loggers: bool):
+        """
+        Delete the selected tables; see `trash_records`.
+        """
+        trash_records(generic_report=generic_report, financial_agreements=financial_agreements, owners_cpf=owners_cpf, loggers=loggers)
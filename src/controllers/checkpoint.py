@@ -0,0 +1,296 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, bindparam, event, exists, func, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from src.models.apiresponse import RunCheckpoint
+from src.utils.log import setup_logger
+from src.utils.streaming import iter_keyset
+
+logger = setup_logger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class CheckpointStore:
+    """
+    Per-key progress of a batch run, persisted in `spreed_sheets.run_checkpoints`.
+
+    Each stage ("convenio", "limit") seeds one row per CPF (or CPF and
+    convenio) it has to query. Results are recorded in memory and written in
+    the same transaction as the rows they produced, so an interrupted run
+    resumes exactly after its last committed batch.
+
+    With a `worker` name, several processes can share a stage: each one
+    claims batches of keys under a lease (`claimed`), and keys whose lease
+    ran out without a result are claimed again by whoever asks next.
+    """
+
+    def __init__(self, stage: str, max_attempts: int = 3, worker: str = None, lease_seconds: float = 600.0):
+        """
+        Args:
+            stage (str): Name of the run stage the keys belong to.
+            max_attempts (int): Failed keys are retried until they reach this many attempts.
+            worker (str): Name of this worker in the leases it takes; None for single-process runs.
+            lease_seconds (float): How long a claimed key stays reserved without a result or a renewal.
+        """
+        self.stage = stage
+        self.max_attempts = max_attempts
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self._marks = {}
+
+    def __len__(self):
+        return len(self._marks)
+
+    def reset(self, session):
+        """
+        Forget every checkpoint of this stage so the next run starts from scratch.
+        """
+        session.query(RunCheckpoint).filter(RunCheckpoint.stage == self.stage).delete()
+        session.commit()
+
+    def seed(self, session, cpf_column, id_convenio_column=None, skip=None) -> int:
+        """
+        Register every source key that has no checkpoint yet as pending.
+
+        Args:
+            session (Session): Open session.
+            cpf_column (Column): CPF column of the source table.
+            id_convenio_column (Column): Convenio column of the source table, if the stage is keyed by it.
+            skip (ColumnElement): Condition on the source row marking its key as answered already (e.g. an
+                ``exists`` on the results table); matching keys are left out, in the same anti-join.
+
+        Returns:
+            int: Number of keys added.
+        """
+        id_convenio = id_convenio_column if id_convenio_column is not None else literal("")
+        known = exists().where(and_(
+            RunCheckpoint.stage == self.stage,
+            RunCheckpoint.cpf == cpf_column,
+            RunCheckpoint.id_convenio == id_convenio,
+        ))
+        source = select(literal(self.stage), cpf_column, id_convenio).where(~known).distinct()
+        if skip is not None:
+            source = source.where(~skip)
+        try:
+            result = session.execute(
+                insert(RunCheckpoint).from_select(["stage", "cpf", "id_convenio"], source)
+            )
+            session.commit()
+        except IntegrityError:
+            # Another worker seeded the same keys first; its rows are as good as ours.
+            session.rollback()
+            logger.info(f"Checkpoints of stage {self.stage} were seeded by another worker.")
+            return 0
+        return result.rowcount
+
+    def _remaining_filter(self):
+        return (
+            RunCheckpoint.stage == self.stage,
+            RunCheckpoint.status != DONE,
+            RunCheckpoint.attempts < self.max_attempts,
+        )
+
+    def count_remaining(self, session) -> int:
+        """
+        Number of keys `remaining` will yield.
+        """
+        return session.execute(
+            select(func.count()).select_from(RunCheckpoint).where(*self._remaining_filter())
+        ).scalar_one()
+
+    def remaining(self, session, page_size: int = 1000):
+        """
+        Stream the keys still to be queried: pending ones plus failures under `max_attempts`.
+
+        Keys are read in keyset-paginated pages, so nothing beyond one page is
+        held in memory and commits on `session` between pages are safe.
+
+        Yields:
+            tuple: ``(cpf, id_convenio)`` in insertion order.
+        """
+        query = select(RunCheckpoint.id, RunCheckpoint.cpf, RunCheckpoint.id_convenio).where(
+            *self._remaining_filter()
+        )
+        for row in iter_keyset(session, query, RunCheckpoint.id, page_size=page_size):
+            yield row.cpf, row.id_convenio
+
+    @staticmethod
+    def _now(session):
+        """
+        Database clock on PostgreSQL, so workers on different machines agree on lease expiry.
+        """
+        if session.get_bind().dialect.name == "postgresql":
+            return func.now()
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def cutoff(self, session, max_age: timedelta):
+        """
+        Instant before which an answer counts as stale, on the clock `claim` uses.
+        """
+        return self._now(session) - max_age
+
+    def expire(self, session, cutoff) -> int:
+        """
+        Queue again the finished keys last answered before `cutoff`, and commit.
+
+        Done and failed keys alike go back to pending with their attempts
+        cleared; keys leased to a worker are left alone.
+
+        Returns:
+            int: Number of keys queued again.
+        """
+        table = RunCheckpoint.__table__
+        result = session.execute(
+            update(table)
+            .where(
+                table.c.stage == self.stage,
+                table.c.status != PENDING,
+                table.c.updated_at < cutoff,
+                table.c.lease_expires_at.is_(None),
+            )
+            .values(status=PENDING, attempts=0, last_error=None, updated_at=func.now())
+        )
+        session.commit()
+        return result.rowcount
+
+    def claim(self, session, limit: int) -> list:
+        """
+        Lease up to `limit` remaining keys that no other worker holds, and commit.
+
+        On PostgreSQL the candidates are locked with ``FOR UPDATE SKIP LOCKED``,
+        so concurrent workers take disjoint batches without waiting on each
+        other. Keys whose lease expired (their worker died) are claimable again.
+
+        Returns:
+            list: ``(cpf, id_convenio)`` tuples now leased to `worker`.
+        """
+        table = RunCheckpoint.__table__
+        now = self._now(session)
+        candidates = (
+            select(table.c.id)
+            .where(*self._remaining_filter(), or_(table.c.lease_expires_at.is_(None), table.c.lease_expires_at < now))
+            .order_by(table.c.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(table)
+            .where(table.c.id.in_(candidates.scalar_subquery()))
+            .values(worker=self.worker, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+            .returning(table.c.cpf, table.c.id_convenio)
+        )
+        rows = session.execute(statement).all()
+        session.commit()
+        return [(row.cpf, row.id_convenio) for row in rows]
+
+    def claimed(self, session, batch_size: int = 500):
+        """
+        Stream keys claimed batch by batch until no unleased key is left.
+
+        Yields:
+            tuple: ``(cpf, id_convenio)``.
+        """
+        while True:
+            batch = self.claim(session, batch_size)
+            if not batch:
+                return
+            yield from batch
+
+    def follow(self, session, seed, upstream_done, batch_size: int = 500, poll_interval: float = 1.0):
+        """
+        Stream keys while an upstream stage is still producing their source rows.
+
+        Whenever no key is left to claim, `seed` is called to pick up rows the
+        upstream committed since; the stream ends once `upstream_done` is set
+        and a last seed finds nothing new.
+
+        Args:
+            session (Session): Open session used for seeding and claiming.
+            seed (callable): Registers new source keys as pending (e.g. a bound `seed`).
+            upstream_done (threading.Event): Set by the upstream stage when it has committed everything.
+            batch_size (int): Keys claimed at a time.
+            poll_interval (float): Seconds to wait for the upstream between empty claims.
+
+        Yields:
+            tuple: ``(cpf, id_convenio)``.
+        """
+        while True:
+            # Read the flag before seeding so rows committed just before it was set are not missed.
+            finished = upstream_done.is_set()
+            batch = self.claim(session, batch_size)
+            if not batch:
+                seed()
+                batch = self.claim(session, batch_size)
+            if batch:
+                yield from batch
+            elif finished:
+                return
+            else:
+                upstream_done.wait(poll_interval)
+
+    def renew(self, session):
+        """
+        Extend the leases this worker still holds, without committing; a no-op without `worker`.
+        """
+        if self.worker is None:
+            return
+        table = RunCheckpoint.__table__
+        now = self._now(session)
+        session.connection().execute(
+            update(table)
+            .where(table.c.stage == self.stage, table.c.worker == self.worker, table.c.lease_expires_at.is_not(None))
+            .values(lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+        )
+
+    def record(self, cpf: str, id_convenio: str, ok: bool, error: str = None):
+        """
+        Buffer the outcome of one key until the next `apply`.
+        """
+        self._marks[(cpf, id_convenio or "")] = {
+            "b_cpf": cpf,
+            "b_id_convenio": id_convenio or "",
+            "status": DONE if ok else FAILED,
+            "last_error": None if ok else error,
+        }
+
+    def fail(self, key: tuple, error: str = None):
+        """
+        Turn the buffered outcome of `key` (``(cpf, id_convenio)``) into a failure, e.g. when its row was dropped.
+        """
+        cpf, id_convenio = key
+        self.record(cpf, id_convenio, ok=False, error=error)
+
+    def apply(self, session):
+        """
+        Write the buffered outcomes through `session` without committing.
+
+        The outcomes stay buffered until `session` commits, so a failed commit
+        applies them again with the next transaction instead of losing them.
+        """
+        if not self._marks:
+            return
+        marks = dict(self._marks)
+
+        def forget(_session):
+            for key, mark in marks.items():
+                if self._marks.get(key) is mark:
+                    del self._marks[key]
+
+        event.listen(session, "after_commit", forget, once=True)
+        table = RunCheckpoint.__table__
+        statement = update(table).where(
+            table.c.stage == self.stage,
+            table.c.cpf == bindparam("b_cpf"),
+            table.c.id_convenio == bindparam("b_id_convenio"),
+        ).values(
+            status=bindparam("status"),
+            last_error=bindparam("last_error"),
+            attempts=table.c.attempts + 1,
+            lease_expires_at=None,
+            updated_at=func.now(),
+        )
+        session.connection().execute(statement, list(marks.values()))
@@ -0,0 +1,76 @@
+import os
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.controllers.schema import ensure_columns, ensure_not_null_keys, ensure_numeric_columns, ensure_unique_indexes
+from src.models.apiresponse import Base, DATABASE_URL
+
+
+class Database:
+    """
+    Pooled engine and session factory, created on first use.
+
+    Nothing connects at import time: commands that never query (help, the
+    menu, exit) start without a database round-trip, and the schema setup
+    (`create_all`, late columns, numeric money columns, NOT NULL keys, unique indexes) runs once per process right
+    before the first session.
+    """
+
+    def __init__(self, url: str = DATABASE_URL, pool_size: int = None, max_overflow: int = None, pre_ping: bool = None):
+        """
+        Args:
+            url (str): SQLAlchemy database URL.
+            pool_size (int): Connections kept open. Defaults to `DB_POOL_SIZE` or 5.
+            max_overflow (int): Extra connections opened under load. Defaults to `DB_MAX_OVERFLOW` or 10.
+            pre_ping (bool): Test pooled connections before use, dropping ones the server closed. Defaults to `DB_POOL_PRE_PING` or on.
+        """
+        self.url = url
+        self.pool_size = pool_size or int(os.getenv("DB_POOL_SIZE", "5"))
+        self.max_overflow = max_overflow if max_overflow is not None else int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.pre_ping = pre_ping if pre_ping is not None else os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false", "False")
+        self._engine = None
+        self._sessionmaker = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._create_engine()
+        return self._engine
+
+    def _create_engine(self):
+        options = {"pool_pre_ping": self.pre_ping}
+        if self.url.startswith("sqlite"):
+            # SQLite (benchmarks, local runs) has no schemas: map `spreed_sheets` to the main database.
+            options["execution_options"] = {"schema_translate_map": {"spreed_sheets": None}}
+        else:
+            options.update(pool_size=self.pool_size, max_overflow=self.max_overflow)
+        engine = create_engine(self.url, **options)
+        Base.metadata.create_all(engine)
+        ensure_columns(engine)
+        ensure_numeric_columns(engine)
+        ensure_not_null_keys(engine)
+        ensure_unique_indexes(engine)
+        self._sessionmaker = sessionmaker(bind=engine)
+        return engine
+
+    def session(self):
+        """
+        New ORM session; drop-in for a ``sessionmaker`` (``Session = database.session``).
+        """
+        self.engine  # creates the session factory on first use
+        return self._sessionmaker()
+
+    def dispose(self, close: bool = True):
+        """
+        Drop pooled connections, e.g. ``close=False`` in forked workers that must not reuse the parent's.
+        """
+        if self._engine is not None:
+            self._engine.dispose(close=close)
+
+
+database = Database()
@@ -9,6 +9,7 @@ class ManagePathDatabaseFiles:
 
         os.makedirs(self.data_path, exist_ok=True)
         os.makedirs(self.trash_path, exist_ok=True)
+        os.makedirs(self.output_path, exist_ok=True)
 
     def save_path_data(self):
         """
@@ -38,19 +39,37 @@ class ManagePathDatabaseFiles:
             print(f"Erro ao listar arquivos no banco de dados: {e}")
             return None
 
-    def move_trash_files(self, move_trash: bool = False) -> None:
+    def list_all_files(self) -> list:
+        """
+        List the full paths of every .xlsx and .csv file in the "data" directory, sorted by name.
+        """
+        try:
+            return [
+                os.path.join(self.data_path, file)
+                for file in sorted(os.listdir(self.data_path))
+                if file.endswith(".xlsx") or file.endswith(".csv")
+            ]
+        except Exception as e:
+            print(f"Erro ao listar arquivos no banco de dados: {e}")
+            return []
+
+    def move_trash_files(self, move_trash: bool = False, files: list = None) -> None:
         """
         Move os arquivos .xlsx e .csv do diretório "data" para a pasta "trash" se move_trash for True.
+        Se `files` for informado, move apenas esses arquivos.
         """
         try:
             if not move_trash:
                 print("Ação de mover arquivos não foi ativada.")
                 return
 
-            files = [
-                file for file in os.listdir(self.data_path)
-                if file.endswith(".xlsx") or file.endswith(".csv")
-            ]
+            if files is not None:
+                files = [os.path.basename(file) for file in files]
+            else:
+                files = [
+                    file for file in os.listdir(self.data_path)
+                    if file.endswith(".xlsx") or file.endswith(".csv")
+                ]
 
             if not files:
                 print("Nenhum arquivo para mover para a lixeira.")
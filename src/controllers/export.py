@@ -0,0 +1,147 @@
+import json
+import os
+
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import JSON, Boolean, Float, Integer, Numeric, TIMESTAMP, select
+
+from src.models.apiresponse import APIResponse
+from src.utils.log import setup_logger
+
+logger = setup_logger(__name__)
+
+EXPORT_FORMATS = ("csv", "parquet", "xlsx")
+XLSX_MAX_ROWS = 1048575  # data rows per sheet, leaving room for the header
+
+
+class ExportApiResponses:
+    """
+    Stream `spreed_sheets.api_responses` into a CSV, Parquet or XLSX file.
+
+    Rows are read through a server-side cursor (or ``COPY TO STDOUT`` for
+    CSV on PostgreSQL) and written chunk by chunk, so memory use depends on
+    `chunk_size`, not on the table size.
+    """
+
+    def __init__(self, engine, output_path: str, chunk_size: int = 50000):
+        """
+        Args:
+            engine (Engine): Engine to read from.
+            output_path (str): Directory receiving the exported file.
+            chunk_size (int): Rows fetched and written per step.
+        """
+        self.engine = engine
+        self.output_path = output_path
+        self.chunk_size = chunk_size
+        self.table = APIResponse.__table__
+
+    def query(self, since: datetime = None, until: datetime = None, id_convenio: str = None):
+        """
+        Select the rows to export, optionally restricted to a consultation date range and convenio.
+        """
+        statement = select(self.table).order_by(self.table.c.id)
+        if since is not None:
+            statement = statement.where(self.table.c.updated_at >= since)
+        if until is not None:
+            statement = statement.where(self.table.c.updated_at < until)
+        if id_convenio is not None:
+            statement = statement.where(self.table.c.id_convenio == id_convenio)
+        return statement
+
+    def export(self, file_format: str = "csv", since: datetime = None, until: datetime = None, id_convenio: str = None) -> str:
+        """
+        Write the selected rows to `output_path/api_responses_<timestamp>.<file_format>`.
+
+        Returns:
+            str: Path of the written file.
+        """
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {file_format}")
+
+        os.makedirs(self.output_path, exist_ok=True)
+        file_path = os.path.join(self.output_path, f"api_responses_{datetime.now():%Y%m%d_%H%M%S}.{file_format}")
+        statement = self.query(since, until, id_convenio)
+
+        if file_format == "csv" and self.engine.dialect.name == "postgresql":
+            self._copy_csv(statement, file_path)
+        else:
+            writer = {"csv": self._write_csv, "parquet": self._write_parquet, "xlsx": self._write_xlsx}[file_format]
+            writer(self.chunks(statement), file_path)
+
+        logger.info(f"Exported api_responses to {file_path}.")
+        return file_path
+
+    def chunks(self, statement):
+        """
+        Yield DataFrames of at most `chunk_size` rows from a server-side cursor.
+        """
+        json_columns = [column.name for column in self.table.columns if isinstance(column.type, JSON)]
+        with self.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=self.chunk_size).execute(statement)
+            columns = list(result.keys())
+            for part in result.partitions():
+                df = pd.DataFrame(part, columns=columns)
+                for column in json_columns:
+                    df[column] = df[column].map(lambda value: None if value is None else json.dumps(value))
+                yield df
+
+    def _copy_csv(self, statement, file_path: str):
+        compiled = statement.compile(dialect=self.engine.dialect)
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor, open(file_path, "w", encoding="utf-8", newline="") as handle:
+                query = cursor.mogrify(str(compiled), compiled.params).decode()
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER, DELIMITER ';')", handle)
+        finally:
+            connection.close()
+
+    def _write_csv(self, chunks, file_path: str):
+        with open(file_path, "w", encoding="utf-8", newline="") as handle:
+            for position, df in enumerate(chunks):
+                df.to_csv(handle, sep=";", index=False, header=position == 0)
+
+    def _write_parquet(self, chunks, file_path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from e
+
+        schema = pa.schema([(column.name, self._arrow_type(pa, column.type)) for column in self.table.columns])
+        with pq.ParquetWriter(file_path, schema) as writer:
+            for df in chunks:
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+
+    @staticmethod
+    def _arrow_type(pa, column_type):
+        if isinstance(column_type, Integer):
+            return pa.int64()
+        if isinstance(column_type, Boolean):
+            return pa.bool_()
+        if isinstance(column_type, Numeric) and not isinstance(column_type, Float) and column_type.precision:
+            return pa.decimal128(column_type.precision, column_type.scale or 0)
+        if isinstance(column_type, Numeric):
+            return pa.float64()
+        if isinstance(column_type, TIMESTAMP):
+            return pa.timestamp("us")
+        return pa.string()
+
+    def _write_xlsx(self, chunks, file_path: str):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        header = [column.name for column in self.table.columns]
+        sheet, sheet_rows, sheets = None, XLSX_MAX_ROWS, 0
+        for df in chunks:
+            for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+                if sheet_rows >= XLSX_MAX_ROWS:
+                    sheets += 1
+                    sheet = workbook.create_sheet(f"api_responses_{sheets}")
+                    sheet.append(header)
+                    sheet_rows = 0
+                sheet.append(row)
+                sheet_rows += 1
+        if sheet is None:
+            workbook.create_sheet("api_responses_1").append(header)
+        workbook.save(file_path)
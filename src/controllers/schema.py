@@ -0,0 +1,132 @@
+from sqlalchemy import Float, Numeric, func, inspect, select, text
+
+from src.models.apiresponse import APIResponse, RunCheckpoint, User, UserFinancialAgreements
+from src.utils.log import setup_logger
+
+logger = setup_logger(__name__)
+
+# Which duplicate survives when a unique index is added to an existing table:
+# the first row loaded for inputs, the latest answer for API responses.
+UNIQUE_TABLES = (
+    (User.__table__, func.min),
+    (UserFinancialAgreements.__table__, func.min),
+    (APIResponse.__table__, func.max),
+)
+
+# Nullable columns added to tables after their first release.
+LATE_COLUMNS = (
+    (RunCheckpoint.__table__, ("worker", "lease_expires_at")),
+)
+
+# Tables whose money columns were created as float before they became NUMERIC.
+NUMERIC_TABLES = (APIResponse.__table__,)
+
+
+def _qualified_name(connection, table) -> str:
+    preparer = connection.dialect.identifier_preparer
+    schema = connection.schema_for_object(table)
+    return preparer.quote(table.name) if schema is None else f"{preparer.quote_schema(schema)}.{preparer.quote(table.name)}"
+
+
+def ensure_unique_indexes(engine):
+    """
+    Create the unique indexes of `UNIQUE_TABLES` on databases created before they existed.
+
+    `create_all` never alters existing tables, so rows duplicated by earlier
+    runs are removed first (keeping one per key) and the index is added.
+    """
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table, keep in UNIQUE_TABLES:
+            existing = {index["name"] for index in inspector.get_indexes(table.name, schema=connection.schema_for_object(table))}
+            for index in table.indexes:
+                if not index.unique or index.name in existing:
+                    continue
+                columns = list(index.columns)
+                survivors = select(keep(table.c.id)).group_by(*columns)
+                removed = connection.execute(table.delete().where(table.c.id.not_in(survivors))).rowcount
+                index.create(connection)
+                logger.info(f"Created {index.name} after removing {removed} duplicate rows from {table.name}.")
+
+
+def ensure_not_null_keys(engine):
+    """
+    Turn the key columns of `UNIQUE_TABLES` that are NOT NULL in the model but not yet in the database into NOT NULL DEFAULT ''.
+
+    NULLs never conflict on a unique index, so rows keyed by a NULL piled
+    up instead of being updated. Rows that only differ by NULL versus ''
+    are deduplicated, the NULLs rewritten to '' (keeping `updated_at`) and
+    the column constrained. The check is a catalog lookup, so it costs
+    nothing once done. Only PostgreSQL needs it: SQLite databases are
+    throwaway (benchmarks, local runs) and cannot alter a column.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        for table, keep in UNIQUE_TABLES:
+            nullable = {column["name"] for column in inspector.get_columns(table.name, schema=connection.schema_for_object(table)) if column["nullable"]}
+            for index in table.indexes:
+                if not index.unique:
+                    continue
+                loose = [column for column in index.columns if not column.nullable and column.name in nullable]
+                if not loose:
+                    continue
+                names = {column.name for column in loose}
+                columns = [func.coalesce(column, "") if column.name in names else column for column in index.columns]
+                survivors = select(keep(table.c.id)).group_by(*columns)
+                removed = connection.execute(table.delete().where(table.c.id.not_in(survivors))).rowcount
+                target = _qualified_name(connection, table)
+                for column in loose:
+                    values = {column.name: ""}
+                    if "updated_at" in table.c:
+                        values["updated_at"] = table.c.updated_at  # not a new answer; keep its age
+                    connection.execute(table.update().where(column.is_(None)).values(values))
+                    name = preparer.quote(column.name)
+                    connection.execute(text(f"ALTER TABLE {target} ALTER COLUMN {name} SET DEFAULT '', ALTER COLUMN {name} SET NOT NULL"))
+                    nullable.discard(column.name)
+                logger.info(f"Made {', '.join(column.name for column in loose)} of {table.name} NOT NULL after removing {removed} duplicate rows.")
+
+
+def ensure_columns(engine):
+    """
+    Add the `LATE_COLUMNS` missing from tables created by an earlier version.
+    """
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        for table, names in LATE_COLUMNS:
+            existing = {column["name"] for column in inspector.get_columns(table.name, schema=connection.schema_for_object(table))}
+            target = _qualified_name(connection, table)
+            for name in names:
+                if name in existing:
+                    continue
+                column_type = table.c[name].type.compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {target} ADD COLUMN {preparer.quote(name)} {column_type}"))
+                logger.info(f"Added column {name} to {table.name}.")
+
+
+def ensure_numeric_columns(engine):
+    """
+    Convert the float money columns of `NUMERIC_TABLES` to the exact NUMERIC type of the model.
+
+    Only PostgreSQL needs it: SQLite columns accept any value, whatever their declared type.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        for table in NUMERIC_TABLES:
+            existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name, schema=connection.schema_for_object(table))}
+            target = _qualified_name(connection, table)
+            for column in table.columns:
+                if not isinstance(column.type, Numeric) or isinstance(column.type, Float):
+                    continue
+                if not isinstance(existing.get(column.name), Float):
+                    continue
+                name = preparer.quote(column.name)
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {target} ALTER COLUMN {name} TYPE {column_type} USING round({name}::numeric, {column.type.scale})"))
+                logger.info(f"Converted {table.name}.{column.name} to {column_type}.")
@@ -0,0 +1,163 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+from datetime import datetime, timezone
+
+from src.models.apiresponse import AuthToken
+from src.utils.log import setup_logger
+from src.utils.metrics import metrics
+from src.utils.upsert import insert_statement
+
+logger = setup_logger(__name__)
+
+
+def jwt_expiry(token: str):
+    """
+    Expiry (epoch seconds) in the ``exp`` claim of a JWT, or None for opaque tokens.
+
+    The signature is not checked: the API does that, we only need to know when to refresh.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+    """
+    Bearer token shared by every worker, refreshed once and ahead of its expiry.
+
+    The token lives in memory and is persisted in its own slot of
+    `spreed_sheets.auth_tokens`, so a new run reuses it while it is valid.
+    Within `refresh_margin` seconds of the expiry one caller refreshes while
+    the others keep using the current token; once it has expired (or the API
+    answered 401) callers wait on the single refresh in flight instead of
+    each fetching their own.
+    """
+
+    def __init__(self, fetch, session_factory=None, slot: str = "banco_master", refresh_margin: float = 60.0, clock=time.time):
+        """
+        Args:
+            fetch (callable): Requests a new token; returns ``(token, expires_in)`` or None on failure.
+            session_factory (sessionmaker): Sessions for the persisted slot; None keeps the token in memory only.
+            slot (str): Key of the persisted token, one per set of credentials.
+            refresh_margin (float): Seconds before the expiry at which the token is refreshed.
+            clock (callable): Wall clock in epoch seconds, injectable for benchmarks.
+        """
+        self.fetch = fetch
+        self.session_factory = session_factory
+        self.slot = slot
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._current = (None, None)
+        self._loaded = session_factory is None
+        self._lock = threading.Lock()
+
+    @property
+    def token(self) -> str:
+        return self._current[0]
+
+    def _valid(self, current: tuple, margin: float) -> bool:
+        token, expires_at = current
+        return token is not None and (expires_at is None or expires_at - self.clock() > margin)
+
+    def get(self) -> str:
+        """
+        Current token, refreshing it first if it is missing or about to expire.
+        """
+        current = self._current
+        if self._valid(current, self.refresh_margin):
+            return current[0]
+        # Still usable: only wait for the lock if nobody else is refreshing already.
+        if not self._lock.acquire(blocking=not self._valid(current, 0)):
+            return current[0]
+        try:
+            if not self._loaded:
+                self._load()
+            if not self._valid(self._current, self.refresh_margin):
+                self._refresh()
+            return self._current[0]
+        finally:
+            self._lock.release()
+
+    async def get_async(self) -> str:
+        """
+        `get` for asyncio tasks; the refresh runs in a thread so the event loop keeps going.
+        """
+        current = self._current
+        if self._valid(current, self.refresh_margin):
+            return current[0]
+        return await asyncio.to_thread(self.get)
+
+    def refresh(self) -> str:
+        """
+        Fetch a new token now, regardless of the current one's expiry.
+        """
+        with self._lock:
+            self._refresh()
+            return self._current[0]
+
+    def invalidate(self, stale_token: str) -> str:
+        """
+        Replace a token the API rejected, once for all workers.
+
+        Callers that got a 401 with the same token queue on the lock; only the
+        first one refreshes, the rest find a different token and just retry.
+        """
+        with self._lock:
+            if self._current[0] == stale_token:
+                self._refresh()
+            return self._current[0]
+
+    def _refresh(self):
+        if self._valid(self._current, 0):
+            metrics.incr("token_proactive_refreshes")
+        result = self.fetch()
+        if not result:
+            return
+        token, expires_in = result
+        expires_at = jwt_expiry(token)
+        if expires_at is None and expires_in:
+            expires_at = self.clock() + float(expires_in)
+        self._current = (token, expires_at)
+        self._save()
+
+    def _load(self):
+        self._loaded = True
+        session = self.session_factory()
+        try:
+            row = session.query(AuthToken).filter(AuthToken.slot == self.slot).first()
+            if row is None:
+                return
+            expires_at = row.expires_at.replace(tzinfo=timezone.utc).timestamp() if row.expires_at else None
+            if self._valid((row.token, expires_at), self.refresh_margin):
+                self._current = (row.token, expires_at)
+                logger.info("Token successfully recovered from the database.")
+        except Exception as e:
+            logger.error(f"Error retrieving token from the database: {e}", exc_info=True)
+        finally:
+            session.close()
+
+    def _save(self):
+        if self.session_factory is None:
+            return
+        token, expires_at = self._current
+        session = self.session_factory()
+        try:
+            statement = insert_statement(session.get_bind().dialect.name, AuthToken.__table__, update=True)
+            session.execute(statement, [{
+                "slot": self.slot,
+                "token": token,
+                "expires_at": datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None) if expires_at else None,
+            }])
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error saving token to the database: {e}", exc_info=True)
+        finally:
+            session.close()
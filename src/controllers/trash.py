@@ -0,0 +1,50 @@
+from src.controllers.database import database
+from src.models.apiresponse import IngestedFile, Loggger, ReportGeneric, User, UserFinancialAgreements
+from src.utils.log import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def trash_records(generic_report: bool, financial_agreements: bool, owners_cpf: bool, loggers: bool):
+    """
+    Delete every row of the selected tables, each in its own transaction.
+
+    Deleting `owners_cpf` or `financial_agreements` also forgets the
+    fingerprints of the files loaded into them, so the same sheets can be
+    ingested again.
+
+    Args:
+        generic_report (bool): Delete `report_generic`.
+        financial_agreements (bool): Delete `financial_agreements`.
+        owners_cpf (bool): Delete `owners_cpf`.
+        loggers (bool): Delete `loggers`.
+    """
+    session = database.session()
+    try:
+        if generic_report:
+            session.query(ReportGeneric).delete()
+            session.commit()
+            logger.info("Report deleted successfully.")
+
+        if financial_agreements:
+            session.query(UserFinancialAgreements).delete()
+            session.query(IngestedFile).filter(IngestedFile.kind == UserFinancialAgreements.__tablename__).delete()
+            session.commit()
+            logger.info("User FinancialAgreements deleted successfully.")
+
+        if owners_cpf:
+            session.query(User).delete()
+            session.query(IngestedFile).filter(IngestedFile.kind == User.__tablename__).delete()
+            session.commit()
+            logger.info("User deleted successfully.")
+
+        if loggers:
+            session.query(Loggger).delete()
+            session.commit()
+            logger.info("Loggers deleted successfully.")
+
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error deleting records: {e}", exc_info=True)
+    finally:
+        session.close()
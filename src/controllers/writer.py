@@ -0,0 +1,182 @@
+import time
+
+from sqlalchemy import insert
+
+from src.utils.bulkload import copy_frame, frame_records
+from src.utils.log import setup_logger
+from src.utils.metrics import metrics
+from src.utils.upsert import insert_statement, upsert_keys
+
+logger = setup_logger(__name__)
+
+
+class BufferedWriter:
+    """
+    Unit-of-work buffer that turns per-result inserts into batched Core inserts.
+
+    Rows are kept as plain dicts per table and written with one executemany
+    ``INSERT`` per table when `batch_size` rows are buffered or `flush_interval`
+    seconds have passed. `add` only buffers; callers mark the end of a unit of
+    work with `maybe_flush`. Callables in `hooks` run inside the same
+    transaction (e.g. `CheckpointStore.apply`), so progress is never committed
+    without its rows. Use it as a context manager to flush on exit, including
+    on errors.
+
+    Tables listed in `mappers` buffer raw API items instead: each flush turns
+    them into one typed DataFrame, written with ``COPY`` on PostgreSQL.
+
+    Rows can be added with the `key` of the unit of work that produced them;
+    when a row is dropped, callables in `on_drop` receive that key before the
+    hooks run, so its progress is not committed as a success.
+    """
+
+    def __init__(self, session_factory, batch_size: int = 500, flush_interval: float = 5.0, hooks: list = None, upserts: dict = None, mappers: dict = None, on_drop: list = None):
+        """
+        Args:
+            session_factory (sessionmaker): Factory for the session each flush runs in.
+            batch_size (int): Buffered rows that trigger a flush.
+            flush_interval (float): Seconds after which a non-empty buffer is flushed anyway.
+            hooks (list): Callables receiving the session before each commit.
+            upserts (dict): Tables resolved on their unique index, mapped to True to
+                update the existing row or False to keep it. Other tables get a plain INSERT.
+            mappers (dict): Tables mapped to a callable turning the buffered items into a DataFrame of their columns.
+            on_drop (list): Callables receiving ``(key, error)`` for each dropped row added with a key.
+        """
+        self.session_factory = session_factory
+        self.upserts = upserts or {}
+        self.mappers = mappers or {}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.hooks = hooks or []
+        self.on_drop = on_drop or []
+        self.written = 0
+        self.failed = 0
+        self._buffer = {}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def add(self, table, row: dict, key=None):
+        """
+        Buffer one row for `table` (the raw item, for tables in `mappers`).
+
+        Args:
+            table (Table): Target table.
+            row (dict): Column values, or the raw item for mapped tables.
+            key: Unit of work the row belongs to, handed to `on_drop` if the row is dropped.
+        """
+        self._buffer.setdefault(table, []).append((row, key))
+        self._buffered += 1
+
+    def maybe_flush(self, pending: int = 0):
+        """
+        Flush when the buffer (plus `pending` hook-side items) is full or stale.
+        """
+        if self._buffered + pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write every buffered row and run the hooks in one transaction.
+
+        If the batch fails, it is rolled back and replayed row by row so a
+        single bad row only loses itself; the hooks then commit on their own.
+        """
+        entries, self._buffer, self._buffered = self._buffer, {}, 0
+        self._last_flush = time.monotonic()
+        buffer = {table: [row for row, _ in pairs] for table, pairs in entries.items()}
+
+        session = self.session_factory()
+        try:
+            if self.mappers:
+                with metrics.stage("response_mapping"):
+                    buffer = {table: self._map(table, rows) for table, rows in buffer.items()}
+            with metrics.stage("db_write"):
+                for table, rows in buffer.items():
+                    self._write(session, table, rows)
+                for hook in self.hooks:
+                    hook(session)
+                session.commit()
+            written = sum(len(rows) for rows in buffer.values())
+            self.written += written
+            metrics.incr("rows_written", written)
+            return
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Batch insert failed, retrying row by row: {e}")
+        finally:
+            session.close()
+
+        self._replay(entries)
+
+    def _map(self, table, rows: list):
+        """
+        DataFrame of the buffered items of a mapped table, or the rows themselves.
+        """
+        if table not in self.mappers:
+            return rows
+        df = self.mappers[table](rows)
+        if table in self.upserts:
+            df = df.drop_duplicates(subset=upsert_keys(table), keep="last")
+        return df
+
+    def _write(self, session, table, rows):
+        if isinstance(rows, list):
+            session.execute(self._statement(session, table), self._unique(table, rows))
+        elif session.get_bind().dialect.name == "postgresql":
+            cursor = session.connection().connection.cursor()
+            try:
+                copy_frame(cursor, table, rows, update=self.upserts.get(table, False))
+            finally:
+                cursor.close()
+        else:
+            session.execute(self._statement(session, table), frame_records(rows))
+
+    def _statement(self, session, table):
+        if table not in self.upserts:
+            return insert(table)
+        return insert_statement(session.get_bind().dialect.name, table, update=self.upserts[table])
+
+    def _unique(self, table, rows: list) -> list:
+        """
+        Keep the last row per conflict key; one statement may not touch a row twice.
+        """
+        if table not in self.upserts:
+            return rows
+        keys = upsert_keys(table)
+        return list({tuple(row.get(key) for key in keys): row for row in rows}.values())
+
+    def _replay(self, entries: dict):
+        session = self.session_factory()
+        try:
+            for table, pairs in entries.items():
+                for row, key in pairs:
+                    try:
+                        if table in self.mappers:
+                            row = frame_records(self.mappers[table]([row]))[0]
+                        session.execute(self._statement(session, table), row)
+                        session.commit()
+                        self.written += 1
+                        metrics.incr("rows_written")
+                    except Exception as e:
+                        session.rollback()
+                        self.failed += 1
+                        metrics.incr("rows_failed")
+                        logger.error(f"Dropped row for {table.name}: {e}")
+                        if key is not None:
+                            for callback in self.on_drop:
+                                callback(key, f"Dropped row for {table.name}: {e}")
+            for hook in self.hooks:
+                hook(session)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error committing batch hooks: {e}", exc_info=True)
+        finally:
+            session.close()
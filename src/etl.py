@@ -0,0 +1,266 @@
+import os
+import pandas as pd
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import select
+from tqdm import tqdm
+from src.utils.log import log_to_parent, setup_logger, worker_logging
+from src.controllers.database import database
+from src.controllers.datapaths import ManagePathDatabaseFiles
+from src.utils.bulkload import BulkLoader
+from src.utils.metrics import metrics
+from src.utils.normalize import normalize_cpf, only_digits, strip_text, valid_cpf
+from src.utils.readers import file_fingerprint, iter_chunks
+from src.utils.upsert import insert_statement
+from src.models.apiresponse import IngestedFile, User, UserFinancialAgreements
+
+logger = setup_logger(__name__)
+
+class ExtractTransformLoad:
+    
+    def __init__(self, file_type: str, file_content: str, batch_size: int = 10000, chunk_size: int = 100000, reject_path: str = None):
+        """
+        Initialize an ExtractTransformLoad object.
+
+        Args:
+            file_type (str): The type of file. Valid options are 'csv' and 'xlsx'.
+            file_content (str): The content of the file to be processed.
+            batch_size (int): Rows written per database transaction.
+            chunk_size (int): Rows read from the file at a time; bounds peak memory.
+            reject_path (str): CSV receiving rows with invalid CPFs. Defaults to `output/cpfs_invalidos_<file>.csv`.
+        """
+        self.file_type = file_type
+        self.file_content = file_content
+        self.chunk_size = chunk_size
+        self.loader = BulkLoader(database.engine, batch_size=batch_size)
+        self.reject_path = reject_path or os.path.join(
+            ManagePathDatabaseFiles().output_path,
+            f"cpfs_invalidos_{os.path.splitext(os.path.basename(str(file_content)))[0]}.csv",
+        )
+        self.rejected = 0
+
+    def valid_rows(self, df, cpf):
+        """
+        Mask of rows whose normalized CPF passes the check digits; the others go to `reject_path`.
+        """
+        valid = valid_cpf(cpf)
+        invalid = df[~valid]
+        if not invalid.empty:
+            invalid.assign(motivo="CPF inválido").to_csv(
+                self.reject_path,
+                sep=";",
+                index=False,
+                mode="a" if self.rejected else "w",
+                header=not self.rejected,
+            )
+            self.rejected += len(invalid)
+            metrics.incr("rows_rejected", len(invalid))
+        return valid
+
+    def read_chunks(self, columns: list):
+        """
+        Stream the input file in chunks holding only `columns`, or return None for unsupported types.
+        """
+        if self.file_type not in ('csv', 'xlsx'):
+            logger.info("Please provide a valid CSV or XLSX file.")
+            return None
+        return iter_chunks(self.file_content, self.file_type, columns, chunk_size=self.chunk_size)
+    
+    def processing_dataframe(self) :
+        """
+            Processing dataframe capturation `CPF` not in `convenio_id`
+        Args:
+            file_content (_type_): str
+            file_type (_type_): str
+
+        Returns:
+            int: Rows saved, or None if the file could not be processed.
+        """
+        try:
+            chunks = self.read_chunks(["cpf", "CELULAR"])
+            if chunks is None:
+                return
+
+            started = time.perf_counter()
+            rows = 0
+            self.rejected = 0
+            for df in tqdm(metrics.timed_iter("file_parse", chunks), desc="Loading CPFs", unit="chunk"):
+                with metrics.stage("normalization"):
+                    cpf = normalize_cpf(df["cpf"])
+                    valid = self.valid_rows(df, cpf)
+                    owners = pd.DataFrame({
+                        "cpf": cpf[valid],
+                        "phone": only_digits(df["CELULAR"][valid]),
+                    }).drop_duplicates(subset=["cpf"])
+                with metrics.stage("db_write"):
+                    rows += self.loader.load(User.__table__, owners)
+            elapsed = time.perf_counter() - started
+            logger.warning(f"Successfully saved {rows} new CPFs to the database in {elapsed:.2f}s.")
+            if self.rejected:
+                logger.warning(f"{self.rejected} rows with invalid CPFs written to {self.reject_path}.")
+            return rows
+        except Exception as e:
+            logger.error(f"Error processing file: {e}", exc_info=True)
+            return None
+
+    def processing_dataframe_financialagreements(self):
+        """
+            Processing dataframe capturation `CPF` with `convenio_id`
+        Args:
+            file_content (_type_): str
+            file_type (_type_): str
+
+        Returns:
+            int: Rows saved, or None if the file could not be processed.
+        """
+        try:
+            chunks = self.read_chunks(["CPF", "id_convenio"])
+            if chunks is None:
+                return
+
+            started = time.perf_counter()
+            rows = 0
+            self.rejected = 0
+            for df in tqdm(metrics.timed_iter("file_parse", chunks), desc="Loading CPFs with id_convenio", unit="chunk"):
+                with metrics.stage("normalization"):
+                    cpf = normalize_cpf(df["CPF"])
+                    valid = self.valid_rows(df, cpf)
+                    agreements = pd.DataFrame({
+                        "cpf": cpf[valid],
+                        "id_convenio": strip_text(df["id_convenio"][valid]),
+                    }).dropna().drop_duplicates()
+                with metrics.stage("db_write"):
+                    rows += self.loader.load(UserFinancialAgreements.__table__, agreements)
+            elapsed = time.perf_counter() - started
+            logger.warning(f"Successfully saved {rows} new CPFs with id_convenio to the database in {elapsed:.2f}s.")
+            if self.rejected:
+                logger.warning(f"{self.rejected} rows with invalid CPFs written to {self.reject_path}.")
+            return rows
+        except Exception as e:
+            logger.error(f"Error processing file: {e}", exc_info=True)
+            return None
+
+def _init_worker(log_records):
+    """
+    Drop connections inherited from the parent process (each worker opens its own) and log through the parent.
+    """
+    database.dispose(close=False)
+    log_to_parent(log_records)
+
+
+def already_ingested(fingerprint: str, kind: str) -> bool:
+    """
+    Whether a file with this content was loaded into `kind` before.
+    """
+    table = IngestedFile.__table__
+    with database.engine.connect() as connection:
+        found = connection.execute(
+            select(table.c.id).where(table.c.fingerprint == fingerprint, table.c.kind == kind)
+        ).first()
+    return found is not None
+
+
+def record_ingested(fingerprint: str, kind: str, file_path: str, rows: int):
+    """
+    Remember a loaded file in `spreed_sheets.ingested_files`; loading the same content again keeps the first entry.
+    """
+    with database.engine.begin() as connection:
+        connection.execute(
+            insert_statement(connection.dialect.name, IngestedFile.__table__),
+            [{"fingerprint": fingerprint, "kind": kind, "file_name": os.path.basename(file_path), "rows": rows}],
+        )
+
+
+def ingest_file(file_path: str, financial_agreements: bool, batch_size: int = 10000, chunk_size: int = 100000, incremental: bool = False) -> dict:
+    """
+    Parse and load one input file, returning a summary of the run.
+
+    Every loaded file is fingerprinted by content; with `incremental`, a file
+    whose fingerprint was loaded before (the same sheet dropped again, under
+    any name) is skipped without being parsed.
+
+    Args:
+        file_path (str): CSV or XLSX file; the type comes from its extension.
+        financial_agreements (bool): Load `CPF`/`id_convenio` rows instead of `cpf`/`CELULAR`.
+        batch_size (int): Rows written per database transaction.
+        chunk_size (int): Rows read from the file at a time.
+        incremental (bool): Skip files already ingested.
+    """
+    started = time.perf_counter()
+    kind = UserFinancialAgreements.__tablename__ if financial_agreements else User.__tablename__
+    fingerprint = file_fingerprint(file_path)
+    if incremental and already_ingested(fingerprint, kind):
+        logger.warning(f"Skipping {file_path}: the same content was already loaded into {kind}.")
+        metrics.incr("files_skipped")
+        return {"file": file_path, "ok": True, "skipped": True, "rows": 0, "seconds": time.perf_counter() - started, "rows_per_second": 0.0}
+
+    file_type = os.path.splitext(file_path)[1].lstrip(".").lower()
+    transformer = ExtractTransformLoad(file_type=file_type, file_content=file_path, batch_size=batch_size, chunk_size=chunk_size)
+    if financial_agreements:
+        rows = transformer.processing_dataframe_financialagreements()
+    else:
+        rows = transformer.processing_dataframe()
+    if rows is not None:
+        record_ingested(fingerprint, kind, file_path, rows)
+    elapsed = time.perf_counter() - started
+    return {
+        "file": file_path,
+        "ok": rows is not None,
+        "skipped": False,
+        "rows": rows or 0,
+        "seconds": elapsed,
+        "rows_per_second": (rows or 0) / elapsed if elapsed else 0.0,
+    }
+
+
+def _ingest_in_worker(*args) -> dict:
+    """
+    `ingest_file` in a pool worker, returning the metrics it recorded with its summary.
+
+    Worker processes have their own registry; the parent merges each file's
+    snapshot into its own so the ETL stages show up in its reports.
+    """
+    metrics.reset()
+    summary = ingest_file(*args)
+    summary["metrics"] = metrics.snapshot()
+    return summary
+
+
+def ingest_files(files: list, financial_agreements: bool, workers: int = None, batch_size: int = 10000, chunk_size: int = 100000, mp_context=None, incremental: bool = False) -> list:
+    """
+    Load several input files concurrently, one process per file.
+
+    Parsing (Excel especially) is CPU-bound, so files are spread over a
+    process pool rather than threads.
+
+    Args:
+        files (list): Paths to load.
+        financial_agreements (bool): Load `CPF`/`id_convenio` rows instead of `cpf`/`CELULAR`.
+        workers (int): Processes to use. Defaults to `ETL_WORKERS` or the CPU count.
+        mp_context (BaseContext): Multiprocessing start method; pass ``spawn`` when other threads hold locks a fork would copy.
+        incremental (bool): Skip files whose content was already ingested.
+
+    Returns:
+        list: One summary dict per file, in completion order.
+    """
+    workers = workers or int(os.getenv("ETL_WORKERS", "0")) or os.cpu_count() or 1
+    database.engine  # set the schema up once, before the workers fork
+    summaries = []
+    with worker_logging(mp_context) as log_records, ProcessPoolExecutor(
+        max_workers=min(workers, len(files)) or 1, mp_context=mp_context, initializer=_init_worker, initargs=(log_records,)
+    ) as executor:
+        futures = {
+            executor.submit(_ingest_in_worker, file_path, financial_agreements, batch_size, chunk_size, incremental): file_path
+            for file_path in files
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Loading files"):
+            try:
+                summary = future.result()
+                metrics.merge(summary.pop("metrics"))
+                summaries.append(summary)
+            except Exception as e:
+                logger.error(f"Error processing file {futures[future]}: {e}", exc_info=True)
+                summaries.append({"file": futures[future], "ok": False, "skipped": False, "rows": 0, "seconds": 0.0, "rows_per_second": 0.0})
+    return summaries
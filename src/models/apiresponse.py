@@ -1,7 +1,7 @@
 import os
 from sqlalchemy import Column, Integer, String, TIMESTAMP, Text
 from sqlalchemy.sql import func
-from sqlalchemy import Column, Integer, String, Float, JSON, TIMESTAMP, func, Boolean
+from sqlalchemy import Column, Integer, String, Numeric, JSON, TIMESTAMP, func, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase
 from dotenv import load_dotenv
 
@@ -13,30 +13,33 @@ DATABASE = os.getenv("DATABASE")
 USERNAME = os.getenv("USERNAME")
 PASSWORD = os.getenv("DBPASSWORD")
 
-DATABASE_URL = f"postgresql://{USERNAME}:{PASSWORD}@{DBHOST}:{DBPORT}/{DATABASE}"
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{USERNAME}:{PASSWORD}@{DBHOST}:{DBPORT}/{DATABASE}"
 
 class Base(DeclarativeBase):
     pass
 
 class APIResponse(Base):
     __tablename__ = 'api_responses'
-    __table_args__ = {'schema': 'spreed_sheets'}
+    __table_args__ = (
+        Index('ux_api_responses_key', 'cpf', 'id_convenio', 'matricula', unique=True),
+        {'schema': 'spreed_sheets'},
+    )
     id = Column(Integer, primary_key=True)
     cpf = Column(String(100), nullable=False)
     nome = Column(String(100))
     phone = Column(String(100))
-    id_convenio = Column(String(50))
-    matricula = Column(String(100))
-    vl_multiplo_saque = Column(Float)
-    limite_utilizado = Column(Float)
-    limite_total = Column(Float)
-    limite_disponivel = Column(Float)
-    vl_limite_parcela = Column(Float)
-    limite_parcela_utilizado = Column(Float)
-    limite_parcela_disponivel = Column(Float)
-    vl_margem = Column(Float)
-    vl_multiplo_compra = Column(Float)
-    vl_limite_compra = Column(Float)
+    id_convenio = Column(String(50), nullable=False, server_default='')
+    matricula = Column(String(100), nullable=False, server_default='')
+    vl_multiplo_saque = Column(Numeric(10, 4))
+    limite_utilizado = Column(Numeric(14, 2))
+    limite_total = Column(Numeric(14, 2))
+    limite_disponivel = Column(Numeric(14, 2))
+    vl_limite_parcela = Column(Numeric(14, 2))
+    limite_parcela_utilizado = Column(Numeric(14, 2))
+    limite_parcela_disponivel = Column(Numeric(14, 2))
+    vl_margem = Column(Numeric(14, 2))
+    vl_multiplo_compra = Column(Numeric(10, 4))
+    vl_limite_compra = Column(Numeric(14, 2))
     cd_banco = Column(String(50))  
     cd_agencia = Column(String(50))  
     cd_conta = Column(String(50))  
@@ -44,8 +47,8 @@ class APIResponse(Base):
     saque_complementar = Column(Boolean) 
     refinanciamento = Column(JSON, nullable=False)
     numero_contrato = Column(Text)
-    vlMaximoParcelas = Column(Float)
-    vlContrato = Column(Float)
+    vlMaximoParcelas = Column(Numeric(14, 2))
+    vlContrato = Column(Numeric(14, 2))
     created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
     updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
 
@@ -57,9 +60,26 @@ class Loggger(Base):
     exception = Column(Text, nullable=True)
     created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
 
+
+class AuthToken(Base):
+    __tablename__ = 'auth_tokens'
+    __table_args__ = (
+        Index('ux_auth_tokens_slot', 'slot', unique=True),
+        {'schema': 'spreed_sheets'},
+    )
+    id = Column(Integer, primary_key=True)
+    slot = Column(String(100), nullable=False)
+    token = Column(Text, nullable=False)
+    expires_at = Column(TIMESTAMP, nullable=True)
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
+
 class User(Base):
     __tablename__ = 'owners_cpf'
-    __table_args__ = {'schema': 'spreed_sheets'}
+    __table_args__ = (
+        Index('ux_owners_cpf_cpf', 'cpf', unique=True),
+        {'schema': 'spreed_sheets'},
+    )
     id = Column(Integer, primary_key=True)
     cpf = Column(Text, nullable=False)
     phone = Column(Text, nullable=True)
@@ -67,13 +87,30 @@ class User(Base):
     
 class UserFinancialAgreements(Base):
     __tablename__ = 'financial_agreements'
-    __table_args__ = {'schema': 'spreed_sheets'}
+    __table_args__ = (
+        Index('ux_financial_agreements_key', 'cpf', 'id_convenio', unique=True),
+        {'schema': 'spreed_sheets'},
+    )
     id = Column(Integer, primary_key=True)
     cpf = Column(Text, nullable=False)
     id_convenio = Column(Text, nullable=False)
     created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
     
     
+class IngestedFile(Base):
+    __tablename__ = 'ingested_files'
+    __table_args__ = (
+        Index('ux_ingested_files_key', 'fingerprint', 'kind', unique=True),
+        {'schema': 'spreed_sheets'},
+    )
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    kind = Column(String(50), nullable=False)
+    file_name = Column(Text, nullable=False)
+    rows = Column(Integer, nullable=False, server_default='0')
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+
 class ReportGeneric(Base):
     __tablename__ = 'report_generic'
     __table_args__ = {'schema': 'spreed_sheets'}
@@ -81,4 +118,23 @@ class ReportGeneric(Base):
     cpf = Column(Text, nullable=False)
     id_convenio = Column(Text, nullable=True)
     message = Column(Text, nullable=True)
-    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
\ No newline at end of file
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+
+class RunCheckpoint(Base):
+    __tablename__ = 'run_checkpoints'
+    __table_args__ = (
+        UniqueConstraint('stage', 'cpf', 'id_convenio', name='uq_run_checkpoints_key'),
+        {'schema': 'spreed_sheets'},
+    )
+    id = Column(Integer, primary_key=True)
+    stage = Column(String(50), nullable=False)
+    cpf = Column(Text, nullable=False)
+    id_convenio = Column(Text, nullable=False, server_default='')
+    status = Column(String(20), nullable=False, server_default='pending')
+    attempts = Column(Integer, nullable=False, server_default='0')
+    last_error = Column(Text, nullable=True)
+    worker = Column(String(200), nullable=True)
+    lease_expires_at = Column(TIMESTAMP, nullable=True)
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
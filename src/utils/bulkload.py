@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import math
+
+import pandas as pd
+
+from sqlalchemy import JSON
+
+from src.utils.upsert import insert_statement, upsert_keys
+
+
+def frame_records(df: pd.DataFrame) -> list:
+    """
+    Rows of `df` as dicts, with missing values as None.
+    """
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _json_text(value) -> str:
+    return json.dumps(None if isinstance(value, float) and math.isnan(value) else value)
+
+
+def copy_frame(cursor, table, df: pd.DataFrame, update: bool = False) -> int:
+    """
+    Write `df` into `table` through ``COPY FROM STDIN`` on a PostgreSQL DBAPI cursor.
+
+    Rows are copied into a temporary staging table and moved with ``INSERT ...
+    ON CONFLICT``: skipped when their key already exists or, with `update`,
+    overwriting the existing row on the table's unique index. The caller owns
+    the transaction.
+
+    Returns:
+        int: Rows inserted (or updated).
+    """
+    json_columns = [column.name for column in table.columns if isinstance(column.type, JSON) and column.name in df]
+    if json_columns:
+        df = df.assign(**{name: df[name].map(_json_text) for name in json_columns})
+
+    buffer = io.StringIO()
+    # Missing values as \N: in CSV COPY an empty field is NULL, which would turn '' key values into NULLs.
+    df.to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_MINIMAL, na_rep="\\N")
+    buffer.seek(0)
+
+    columns = ", ".join(_quote(name) for name in df.columns)
+    staging = f"staging_{table.name}"
+    if update:
+        keys = upsert_keys(table)
+        skip = set(keys) | {column.name for column in table.primary_key} | {"created_at", "updated_at"}
+        values = [f"{_quote(name)} = EXCLUDED.{_quote(name)}" for name in df.columns if name not in skip]
+        if "updated_at" in table.columns:
+            values.append("updated_at = now()")
+        conflict = f"ON CONFLICT ({', '.join(_quote(key) for key in keys)}) DO UPDATE SET {', '.join(values)}"
+    else:
+        conflict = "ON CONFLICT DO NOTHING"
+
+    cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {table.fullname} WITH NO DATA")
+    cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    cursor.execute(f"INSERT INTO {table.fullname} ({columns}) SELECT {columns} FROM {staging} {conflict}")
+    written = cursor.rowcount
+    cursor.execute(f"DROP TABLE {staging}")
+    return written
+
+
+class BulkLoader:
+    """
+    Load DataFrames into a table in batches, one transaction per batch.
+
+    PostgreSQL connections stream each batch through ``COPY FROM STDIN``
+    into a temporary staging table and move it with ``INSERT ... ON CONFLICT
+    DO NOTHING``; any other backend falls back to a batched ``executemany``
+    insert. Rows already present under the table's unique index are skipped.
+    """
+
+    def __init__(self, engine, batch_size: int = 10000):
+        """
+        Args:
+            engine (Engine): SQLAlchemy engine used to open connections.
+            batch_size (int): Number of rows sent per transaction.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer.")
+        self.engine = engine
+        self.batch_size = batch_size
+
+    def load(self, table, df: pd.DataFrame) -> int:
+        """
+        Insert every row of ``df`` into ``table``.
+
+        Args:
+            table (Table): Target table; ``df`` columns must match its column names.
+            df (pd.DataFrame): Rows to insert.
+
+        Returns:
+            int: Number of new rows written.
+        """
+        written = 0
+        for start in range(0, len(df), self.batch_size):
+            batch = df.iloc[start:start + self.batch_size]
+            if self.engine.dialect.name == "postgresql":
+                written += self._copy(table, batch)
+            else:
+                written += self._executemany(table, batch)
+        return written
+
+    def _copy(self, table, batch: pd.DataFrame) -> int:
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                inserted = copy_frame(cursor, table, batch)
+            connection.commit()
+            return inserted
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def _executemany(self, table, batch: pd.DataFrame) -> int:
+        records = frame_records(batch)
+        with self.engine.begin() as connection:
+            result = connection.execute(insert_statement(self.engine.dialect.name, table), records)
+        return result.rowcount if result.rowcount >= 0 else len(records)
@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class SQLiteCacheBackend:
+    """
+    Local persistent store for cached responses, shared by every thread of the process.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, payload TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload, stored_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value, stored_at: float):
+        payload = json.dumps(value)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO response_cache (key, payload, stored_at) VALUES (?, ?, ?)",
+                (key, payload, stored_at),
+            )
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "DELETE FROM response_cache WHERE stored_at < ?", (older_than,)
+            ).rowcount
+
+
+class ResponseCache:
+    """
+    Two-level TTL cache for API responses: an in-process LRU in front of a persistent backend.
+
+    Keys are built by the caller from the endpoint and its CPF / convenio
+    arguments. Only successful responses should be stored.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 100000, backend: SQLiteCacheBackend = None, clock=time.time):
+        """
+        Args:
+            ttl (float): Seconds a response stays valid.
+            max_entries (int): Entries kept in the in-process LRU.
+            backend (SQLiteCacheBackend): Persistent store consulted on LRU misses; optional.
+            clock (callable): Wall clock, since entries outlive the process.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend = backend
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Return the cached response for `key`, or None if absent or expired.
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        entry = self.backend.get(key) if self.backend else None
+        with self._lock:
+            if entry is not None and now - entry[1] < self.ttl:
+                self._remember(key, entry)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value):
+        entry = (value, self.clock())
+        with self._lock:
+            self._remember(key, entry)
+        if self.backend:
+            self.backend.set(key, value, entry[1])
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def default_cache():
+    """
+    Build the cache configured by `MASTER_CACHE_*`, or None when `MASTER_CACHE_TTL` is 0.
+    """
+    ttl = float(os.getenv("MASTER_CACHE_TTL", "86400"))
+    if ttl <= 0:
+        return None
+    backend = SQLiteCacheBackend(os.getenv("MASTER_CACHE_PATH", "cache.sqlite"))
+    backend.purge(older_than=time.time() - ttl)
+    return ResponseCache(ttl, max_entries=int(os.getenv("MASTER_CACHE_SIZE", "100000")), backend=backend)
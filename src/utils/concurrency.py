@@ -0,0 +1,29 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+
+def imap_unordered(fn, items, workers: int):
+    """
+    Yield ``fn(item)`` for every item, running up to ``workers`` calls at once.
+
+    Results come back in completion order. Only ``2 * workers`` items are
+    pulled from ``items`` ahead of time, so lazy sources are never drained
+    into memory.
+
+    Args:
+        fn (callable): Function applied to each item; it should handle its own errors.
+        items (iterable): Work items.
+        workers (int): Number of threads issuing calls concurrently.
+    """
+    if workers < 1:
+        raise ValueError("workers must be a positive integer.")
+
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(fn, item) for item in islice(items, workers * 2)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for item in islice(items, 1):
+                    pending.add(executor.submit(fn, item))
+                yield future.result()
@@ -0,0 +1,108 @@
+import os
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def http_timeout() -> tuple:
+    """
+    ``(connect, read)`` timeout in seconds, from `MASTER_HTTP_CONNECT_TIMEOUT` / `MASTER_HTTP_READ_TIMEOUT`.
+    """
+    return (
+        float(os.getenv("MASTER_HTTP_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("MASTER_HTTP_READ_TIMEOUT", "30")),
+    )
+
+
+def http_retries() -> tuple:
+    """
+    ``(retries, backoff_factor)`` from `MASTER_HTTP_RETRIES` / `MASTER_HTTP_BACKOFF`.
+    """
+    return int(os.getenv("MASTER_HTTP_RETRIES", "3")), float(os.getenv("MASTER_HTTP_BACKOFF", "0.5"))
+
+
+def backoff_delay(attempt: int, backoff_factor: float = 0.5, backoff_jitter: float = 0.5) -> float:
+    """
+    Seconds to wait before retry number `attempt` (from 1): exponential backoff plus random jitter.
+    """
+    return backoff_factor * 2 ** (attempt - 1) + random.uniform(0, backoff_jitter)
+
+
+def build_adapter(pool_size: int = 16, retries: int = 3, backoff_factor: float = 0.5, backoff_jitter: float = 0.5) -> HTTPAdapter:
+    """
+    Connection pool and retry policy of the sessions built by `build_session`.
+
+    Only failed connections are retried here: nothing reached the API, so
+    they cost no rate budget. Read errors and 5xx answers are retried by the
+    caller, through its rate limiter (see `backoff_delay`).
+
+    The pool blocks when every connection is busy, so a thread beyond
+    `pool_size` waits for a kept-alive connection instead of opening (and
+    then discarding) a new one.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=0,
+        other=0,
+        allowed_methods=frozenset({"GET", "POST"}),
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        raise_on_status=False,
+        respect_retry_after_header=False,
+    )
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+
+
+def build_session(pool_size: int = 16, retries: int = 3, backoff_factor: float = 0.5, backoff_jitter: float = 0.5):
+    """
+    Create a keep-alive session with a connection pool and retry policy.
+
+    Connection errors are retried with exponential backoff plus random
+    jitter; read errors, 5xx and 429 are left to the caller's rate limiter.
+
+    Args:
+        pool_size (int): Connections kept open per host; should cover the worker count.
+        retries (int): Retries per request before giving up.
+        backoff_factor (float): Base delay, doubled on every retry.
+        backoff_jitter (float): Upper bound of the random delay added to each backoff.
+    """
+    adapter = build_adapter(pool_size, retries, backoff_factor, backoff_jitter)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(pool_size: int = 0):
+    """
+    Return the process-wide session shared by every Banco Master client.
+
+    Args:
+        pool_size (int): Connections the caller keeps in flight. The pool holds at least this many
+            (and at least `MASTER_HTTP_POOL_SIZE` or 16), growing in place if an earlier caller needed fewer.
+    """
+    global _session, _pool_size
+    with _session_lock:
+        size = max(int(os.getenv("MASTER_HTTP_POOL_SIZE", "16")), pool_size)
+        retries, backoff_factor = http_retries()
+        options = {"retries": retries, "backoff_factor": backoff_factor}
+        if _session is None:
+            _session = build_session(pool_size=size, **options)
+        elif size > _pool_size:
+            adapter = build_adapter(size, **options)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        _pool_size = max(_pool_size, size)
+        return _session
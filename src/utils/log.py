@@ -1,20 +1,173 @@
+import atexit
+import collections
+import json
 import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
 
-def setup_logger(name: str):
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+_queue = None
+_queue_handler = None
+_listener = None
+_configure_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, for log shippers.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _build_handlers():
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(os.getenv("LOG_CONSOLE_LEVEL", "INFO").upper())
 
-    file_handler = logging.FileHandler('src.log')
-    file_handler.setLevel(logging.DEBUG)
+    file_handler = RotatingFileHandler(
+        os.getenv("LOG_FILE", "src.log"),
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv("LOG_BACKUPS", "5")),
+        encoding="utf-8",
+    )
+    file_handler.setLevel(os.getenv("LOG_FILE_LEVEL", "INFO").upper())
 
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     console_handler.setFormatter(formatter)
     file_handler.setFormatter(formatter)
+    return console_handler, file_handler
+
+
+def _restart_listener_in_child():
+    """
+    Forked workers inherit the queue but not the listener thread; start a new one.
+
+    It only writes to the console: the parent owns the rotating log file,
+    which several processes cannot append to and rotate safely. Pool
+    workers send their records to the parent instead (`log_to_parent`).
+    """
+    global _listener
+    if _listener is not None:
+        console = [handler for handler in _listener.handlers if not isinstance(handler, logging.FileHandler)]
+        _listener = QueueListener(_queue, *console, respect_handler_level=True)
+        _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    """
+    Start the shared queue listener once per process.
+
+    Loggers only enqueue records; a background QueueListener formats them
+    and writes to the console and a size-rotated log file, so hot loops
+    never block on file I/O. Configured through `LOG_FORMAT` (text/json),
+    `LOG_FILE`, `LOG_MAX_BYTES`, `LOG_BACKUPS`, `LOG_CONSOLE_LEVEL` and
+    `LOG_FILE_LEVEL`.
+    """
+    global _queue, _queue_handler, _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        _queue = queue.SimpleQueue()
+        _queue_handler = QueueHandler(_queue)
+        _listener = QueueListener(_queue, *_build_handlers(), respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+        os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def setup_logger(name: str):
+    configure_logging()
+    logger = logging.getLogger(name)
+    # Records below every handler's level are never created, let alone queued.
+    logger.setLevel(min(handler.level for handler in _listener.handlers))
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
+    logger.propagate = False
+    return logger
+
+
+@contextmanager
+def worker_logging(mp_context=None):
+    """
+    Collect the records of a process pool and write them through this process's handlers.
+
+    Yields a queue to hand to the workers' initializer (`log_to_parent`), so
+    only the parent writes, and rotates, the log file.
+
+    Args:
+        mp_context (BaseContext): Start method of the pool; defaults to the multiprocessing default.
+    """
+    configure_logging()
+    records = (mp_context or multiprocessing).Queue()
+    listener = QueueListener(records, *_listener.handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        yield records
+    finally:
+        listener.stop()
+
+
+def log_to_parent(records):
+    """
+    Pool initializer: send every record of this worker to the parent's `worker_logging` queue.
+    """
+    configure_logging()
+    _queue_handler.queue = records
+
+
+class EventAggregator:
+    """
+    Collapse per-row events into one summary line every `interval` seconds.
+
+    Each event is counted and its detail logged at DEBUG (dropped unless
+    `LOG_FILE_LEVEL=DEBUG`), so millions of per-CPF messages cost a counter
+    increment instead of a line of output each.
+    """
+
+    def __init__(self, logger, interval: float = 10.0):
+        self.logger = logger
+        self.interval = interval
+        self.counts = collections.Counter()
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
 
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    def record(self, event: str, detail: str = None):
+        if detail and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(detail)
+        with self._lock:
+            self.counts[event] += 1
+            due = time.monotonic() - self._last >= self.interval
+        if due:
+            self.flush()
 
-    return logger
\ No newline at end of file
+    def flush(self):
+        with self._lock:
+            counts, self.counts = self.counts, collections.Counter()
+            elapsed = time.monotonic() - self._last
+            self._last = time.monotonic()
+        if counts:
+            summary = ", ".join(f"{event}={count}" for event, count in sorted(counts.items()))
+            self.logger.info(f"Last {elapsed:.0f}s: {summary}")
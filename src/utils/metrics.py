@@ -0,0 +1,291 @@
+import bisect
+import cProfile
+import collections
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+
+from src.utils.log import setup_logger
+
+logger = setup_logger(__name__)
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram in the Prometheus style.
+    """
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the `q` quantile (`max` for the overflow bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+
+class Metrics:
+    """
+    Process-wide registry of stage timings and event counters.
+
+    Stages (file parse, normalization, DB write, HTTP wait, rate-limit sleep,
+    token refresh) are timed into histograms; counters track requests, 401s,
+    errors and cache hits. Everything is thread-safe and cheap enough to
+    leave on in the hot loops.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = collections.Counter()
+        self.histograms = {}
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time the enclosed block into the `name` histogram.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def timed_iter(self, name: str, iterable):
+        """
+        Yield from `iterable`, timing how long each item takes to produce.
+        """
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.observe(name, time.perf_counter() - started)
+            yield item
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "counters": dict(self.counters),
+                "stages": {
+                    name: {
+                        "count": histogram.count,
+                        "total_seconds": round(histogram.sum, 6),
+                        "mean_seconds": round(histogram.sum / histogram.count, 6) if histogram.count else 0.0,
+                        "p50_seconds": histogram.quantile(0.5),
+                        "p99_seconds": histogram.quantile(0.99),
+                        "max_seconds": round(histogram.max, 6),
+                        "buckets": list(histogram.counts),
+                    }
+                    for name, histogram in self.histograms.items()
+                },
+            }
+
+    def merge(self, snapshot: dict):
+        """
+        Add the counters and stage histograms of another registry's `snapshot`, e.g. one taken in a worker process.
+        """
+        with self._lock:
+            self.counters.update(snapshot.get("counters", {}))
+            for name, stage in snapshot.get("stages", {}).items():
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = Histogram()
+                histogram.counts = [mine + theirs for mine, theirs in zip(histogram.counts, stage["buckets"])]
+                histogram.count += stage["count"]
+                histogram.sum += stage["total_seconds"]
+                histogram.max = max(histogram.max, stage["max_seconds"])
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = "fast_spreed") -> str:
+        """
+        Render the registry in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+            if self.histograms:
+                lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        One-line digest: total time per stage and the counters.
+        """
+        snapshot = self.snapshot()
+        stages = ", ".join(
+            f"{name}={stage['total_seconds']:.1f}s/{stage['count']}"
+            for name, stage in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["total_seconds"])
+        )
+        counters = ", ".join(f"{name}={value}" for name, value in sorted(snapshot["counters"].items()))
+        return f"stages: {stages or '-'} | counters: {counters or '-'}"
+
+    def dump(self, path: str):
+        """
+        Write the registry to `path`: Prometheus text for `.prom`, JSON otherwise.
+        """
+        content = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+
+
+metrics = Metrics()
+
+
+class PeriodicReporter:
+    """
+    Background thread logging `metrics.summary()` every `interval` seconds.
+    """
+
+    def __init__(self, registry: Metrics = metrics, interval: float = 60.0):
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            logger.info(f"Metrics: {self.registry.summary()}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        logger.info(f"Metrics: {self.registry.summary()}")
+        return False
+
+
+class SamplingProfiler:
+    """
+    Low-overhead profiler counting which functions every thread is in, `interval` seconds apart.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                self.samples[f"{code.co_filename}:{frame.f_lineno} ({code.co_name})"] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, limit: int = 30) -> str:
+        total = sum(self.samples.values()) or 1
+        return "\n".join(
+            f"{count / total:7.2%} {count:8d}  {location}"
+            for location, count in self.samples.most_common(limit)
+        )
+
+
+@contextmanager
+def profiled(mode: str = None, output: str = None):
+    """
+    Profile the enclosed block with ``cprofile`` or ``sample``; do nothing when `mode` is empty.
+
+    The report (pstats sorted by cumulative time, or sampled hot lines) is
+    written to `output` if given and logged otherwise. cProfile only sees the
+    calling thread; ``sample`` also covers the request worker threads.
+    """
+    if not mode:
+        yield
+        return
+    if mode not in ("cprofile", "sample"):
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+    profiler = cProfile.Profile() if mode == "cprofile" else SamplingProfiler()
+    if mode == "cprofile":
+        profiler.enable()
+    else:
+        profiler.start()
+    try:
+        yield
+    finally:
+        if mode == "cprofile":
+            profiler.disable()
+            buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(40)
+            report = buffer.getvalue()
+        else:
+            profiler.stop()
+            report = profiler.report()
+        if output:
+            with open(output, "w", encoding="utf-8") as handle:
+                handle.write(report)
+            logger.info(f"Profile written to {output}.")
+        else:
+            logger.info(f"Profile:\n{report}")
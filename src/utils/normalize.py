@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+
+def only_digits(series: pd.Series) -> pd.Series:
+    """
+    Strip every character but the ASCII digits 0-9 from a column in one vectorized pass.
+
+    ``\\D`` would keep Unicode digits (full-width ``５``, Arabic-Indic), which are not CPF digits.
+
+    Args:
+        series (pd.Series): Raw column as read from the spreadsheet.
+
+    Returns:
+        pd.Series: Nullable string column; empty values become ``<NA>``.
+    """
+    digits = series.astype("string").str.replace(r"[^0-9]", "", regex=True)
+    return digits.mask(digits == "")
+
+
+def strip_text(series: pd.Series) -> pd.Series:
+    """
+    Trim surrounding whitespace from a text column, mapping blanks to ``<NA>``.
+    """
+    text = series.astype("string").str.strip()
+    return text.mask(text == "")
+
+
+FIRST_DIGIT_WEIGHTS = np.arange(10, 1, -1)
+SECOND_DIGIT_WEIGHTS = np.arange(11, 1, -1)
+
+
+def normalize_cpf(series: pd.Series) -> pd.Series:
+    """
+    Reduce CPFs to their 11 digits, restoring leading zeros lost by spreadsheets.
+
+    Values with more than 11 digits are kept as-is so validation rejects them.
+    """
+    digits = only_digits(series)
+    return digits.where(digits.str.len() > 11, digits.str.zfill(11))
+
+
+def valid_cpf(series: pd.Series) -> pd.Series:
+    """
+    Check both mod-11 verification digits of a normalized CPF column at once.
+
+    The column is turned into an ``(n, 11)`` digit matrix so the weighted
+    sums are two matrix products instead of a Python loop per row. CPFs
+    with a repeated single digit (``111.111.111-11``) are rejected as well.
+
+    Returns:
+        pd.Series: Boolean mask aligned with ``series``.
+    """
+    mask = pd.Series(False, index=series.index)
+    shaped = series.notna() & series.str.fullmatch(r"[0-9]{11}").astype("boolean").fillna(False).astype(bool)
+    candidates = series[shaped]
+    if candidates.empty:
+        return mask
+
+    digits = np.frombuffer("".join(candidates).encode("ascii"), dtype=np.uint8).reshape(-1, 11) - ord("0")
+    first = (digits[:, :9] @ FIRST_DIGIT_WEIGHTS * 10) % 11 % 10
+    second = (digits[:, :10] @ SECOND_DIGIT_WEIGHTS * 10) % 11 % 10
+    repeated = (digits == digits[:, :1]).all(axis=1)
+
+    mask[shaped] = (first == digits[:, 9]) & (second == digits[:, 10]) & ~repeated
+    return mask
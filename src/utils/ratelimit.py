@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+DEFAULT_SCHEDULE = "07:00-20:00=100,default=2000"
+
+
+class RateSchedule:
+    """
+    Per-minute request budget that depends on the time of day.
+
+    Windows are inclusive on both ends and checked in order; the first match
+    wins, otherwise ``default`` applies. Windows may wrap past midnight
+    (e.g. ``22:00-06:00``).
+    """
+
+    def __init__(self, windows: list, default: int):
+        """
+        Args:
+            windows (list): ``(start, end, per_minute)`` tuples with ``datetime.time`` bounds.
+            default (int): Requests per minute outside every window.
+        """
+        self.windows = windows
+        self.default = default
+
+    @classmethod
+    def parse(cls, spec: str = DEFAULT_SCHEDULE):
+        """
+        Build a schedule from ``"HH:MM-HH:MM=rate,...,default=rate"``.
+        """
+        windows = []
+        default = None
+        for part in filter(None, (chunk.strip() for chunk in spec.split(","))):
+            span, _, rate = part.partition("=")
+            if span.strip() == "default":
+                default = int(rate)
+                continue
+            start, _, end = span.partition("-")
+            windows.append((
+                datetime.strptime(start.strip(), "%H:%M").time(),
+                datetime.strptime(end.strip(), "%H:%M").time(),
+                int(rate),
+            ))
+        if default is None:
+            raise ValueError(f"Rate schedule {spec!r} has no default rate.")
+        return cls(windows, default)
+
+    def per_minute(self, now: datetime = None) -> int:
+        current = (now or datetime.now()).time()
+        for start, end, rate in self.windows:
+            if start <= end:
+                if start <= current <= end:
+                    return rate
+            elif current >= start or current <= end:
+                return rate
+        return self.default
+
+
+class TokenBucket:
+    """
+    Token-bucket limiter that paces requests evenly instead of bursting.
+
+    Each caller reserves a slot under a lock and then sleeps outside it, so
+    the bucket can be shared by threads (``acquire``) and asyncio tasks
+    (``acquire_async``) without serializing the sleeps.
+    """
+
+    def __init__(self, schedule: RateSchedule, burst: int = 1, clock=time.monotonic):
+        """
+        Args:
+            schedule (RateSchedule): Source of the current per-minute rate.
+            burst (int): Requests allowed back-to-back after an idle period.
+            clock (callable): Monotonic clock, injectable for benchmarks.
+        """
+        self.schedule = schedule
+        self.capacity = max(1, burst)
+        self.clock = clock
+        self.tokens = float(self.capacity)
+        self.updated_at = clock()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token and return how many seconds the caller must wait before using it.
+        """
+        with self._lock:
+            now = self.clock()
+            rate = self.schedule.per_minute() / 60.0
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * rate)
+            self.updated_at = now
+            self.tokens -= 1
+            delay = -self.tokens / rate if self.tokens < 0 else 0.0
+            return delay + max(0.0, self.blocked_until - now)
+
+    def acquire(self) -> float:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def pause(self, seconds: float):
+        """
+        Hold every caller for ``seconds``, e.g. after a 429 with ``Retry-After``.
+        """
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+def retry_after_seconds(value: str, default: float) -> float:
+    """
+    Parse a ``Retry-After`` header given either as seconds or as an HTTP date.
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now().astimezone()).total_seconds())
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,91 @@
+import hashlib
+
+import pandas as pd
+
+
+def iter_csv_chunks(path: str, columns: list, chunk_size: int = 100000, sep: str = ";"):
+    """
+    Stream a CSV file as DataFrames of at most `chunk_size` rows.
+
+    Only `columns` are parsed, all as nullable strings, so peak memory is
+    bounded by the chunk rather than the file.
+    """
+    reader = pd.read_csv(
+        path,
+        sep=sep,
+        usecols=columns,
+        dtype={column: "string" for column in columns},
+        chunksize=chunk_size,
+    )
+    with reader:
+        yield from reader
+
+
+def iter_xlsx_chunks(path: str, columns: list, chunk_size: int = 100000):
+    """
+    Stream the first sheet of an XLSX file as DataFrames of at most `chunk_size` rows.
+
+    The workbook is opened in openpyxl read-only mode, which parses rows
+    lazily instead of building the whole sheet in memory. The first row is
+    taken as the header.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(value).strip() if value is not None else "" for value in next(rows, ())]
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"Columns not found in {path}: {missing}")
+        positions = [header.index(column) for column in columns]
+
+        buffer = []
+        for row in rows:
+            buffer.append([cell_text(row[position]) if position < len(row) else None for position in positions])
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=columns, dtype="string")
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, dtype="string")
+    finally:
+        workbook.close()
+
+
+def cell_text(value):
+    """
+    Render an Excel cell as text, keeping integral numbers free of a trailing ``.0``.
+    """
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_chunks(path: str, file_type: str, columns: list, chunk_size: int = 100000):
+    """
+    Stream `path` as DataFrame chunks holding only `columns`.
+
+    Args:
+        path (str): Input file.
+        file_type (str): 'csv' or 'xlsx'.
+        columns (list): Header names to keep.
+        chunk_size (int): Rows per chunk.
+    """
+    if file_type == "csv":
+        return iter_csv_chunks(path, columns, chunk_size)
+    if file_type == "xlsx":
+        return iter_xlsx_chunks(path, columns, chunk_size)
+    raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def file_fingerprint(path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    SHA-256 of the bytes of `path`, read in blocks; identical sheets share it whatever their name.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
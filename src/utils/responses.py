@@ -0,0 +1,93 @@
+import pandas as pd
+
+from sqlalchemy import Boolean, Numeric, String
+
+from src.models.apiresponse import APIResponse
+
+# `api_responses` column -> key of the limit answer.
+LIMIT_FIELDS = {
+    "cpf": "cpf",
+    "nome": "nome",
+    "id_convenio": "idConvenio",
+    "matricula": "matricula",
+    "vl_multiplo_saque": "vlMultiploSaque",
+    "limite_utilizado": "limiteUtilizado",
+    "limite_total": "limiteTotal",
+    "limite_disponivel": "limiteDisponivel",
+    "vl_limite_parcela": "vlLimiteParcela",
+    "limite_parcela_utilizado": "limiteParcelaUtilizado",
+    "limite_parcela_disponivel": "limiteParcelaDisponivel",
+    "vl_margem": "vlMargem",
+    "vl_multiplo_compra": "vlMultiploCompra",
+    "vl_limite_compra": "vlLimiteCompra",
+    "cd_banco": "cdBanco",
+    "cd_agencia": "cdAgencia",
+    "cd_conta": "cdConta",
+    "nao_perturbe": "naoPerturbe",
+    "saque_complementar": "saqueComplementar",
+}
+
+# `api_responses` column -> key of the nested `contratoRefinanciamento` object.
+CONTRACT_FIELDS = {
+    "refinanciamento": "refinanciamento",
+    "numero_contrato": "numeroContratos",
+    "vlMaximoParcelas": "vlMaximoParcela",
+    "vlContrato": "valor",
+}
+
+BOOLEANS = {True: True, False: False, "true": True, "false": False}
+
+# Nullable columns of the `api_responses` conflict key; NULLs never conflict, so missing values are stored as ''.
+BLANK_KEYS = ["id_convenio", "matricula"]
+
+
+def text_codes(series: pd.Series) -> pd.Series:
+    """
+    Codes as text; integer codes with gaps arrive as floats (``243.0``) and are printed back as integers.
+    """
+    if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+        series = series.astype("Int64")
+    return series.astype("string")
+
+
+def typed_frame(table, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast every column of `df` to the type of the `table` column it feeds.
+
+    Numeric columns become floats, left unrounded: they are sent in their
+    shortest round-trip form, so the ``NUMERIC`` column rounds the API's own
+    decimal text exactly. Boolean columns become nullable booleans and
+    String columns text; anything else (JSON) is left as parsed.
+    """
+    for column in table.columns:
+        if column.name not in df:
+            continue
+        series = df[column.name]
+        if isinstance(column.type, Numeric):
+            df[column.name] = pd.to_numeric(series, errors="coerce")
+        elif isinstance(column.type, Boolean):
+            df[column.name] = series.map(BOOLEANS).astype("boolean")
+        elif isinstance(column.type, String):
+            df[column.name] = text_codes(series)
+    return df
+
+
+def limits_frame(items: list) -> pd.DataFrame:
+    """
+    Map a batch of limit answers to typed `api_responses` columns in one columnar pass.
+
+    Args:
+        items (list): Answer objects of ``/consignado/v1/limite/consultar``.
+
+    Returns:
+        pd.DataFrame: One row per answer, columns named after `api_responses`.
+    """
+    answers = pd.DataFrame.from_records(items, columns=list(LIMIT_FIELDS.values()))
+    contracts = pd.DataFrame.from_records(
+        [item.get("contratoRefinanciamento") or {} for item in items],
+        columns=list(CONTRACT_FIELDS.values()),
+    )
+    df = pd.concat([answers.set_axis(list(LIMIT_FIELDS), axis=1), contracts.set_axis(list(CONTRACT_FIELDS), axis=1)], axis=1)
+    df = typed_frame(APIResponse.__table__, df)
+    df[BLANK_KEYS] = df[BLANK_KEYS].fillna("")
+    return df
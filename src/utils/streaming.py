@@ -0,0 +1,26 @@
+def iter_keyset(session, statement, key_column, page_size: int = 1000):
+    """
+    Stream the rows of ``statement`` in pages ordered by ``key_column``.
+
+    Each page is a fresh ``WHERE key > last ORDER BY key LIMIT n`` query, so
+    memory stays bounded by ``page_size`` and the caller may commit on the
+    same session between pages (server-side cursors would be closed by it).
+
+    Args:
+        session (Session): Open session used for every page.
+        statement (Select): Query to page through; it must select ``key_column``.
+        key_column (Column): Unique, indexed column to paginate on (usually ``id``).
+        page_size (int): Rows fetched per round-trip.
+    """
+    last_key = None
+    while True:
+        page = statement.order_by(key_column).limit(page_size)
+        if last_key is not None:
+            page = page.where(key_column > last_key)
+        rows = session.execute(page).all()
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_key = getattr(rows[-1], key_column.key)
@@ -0,0 +1,42 @@
+from sqlalchemy import func, insert
+
+
+def upsert_keys(table) -> list:
+    """
+    Column names of the unique index used as the conflict target of `table`.
+    """
+    for index in table.indexes:
+        if index.unique:
+            return [column.name for column in index.columns]
+    raise ValueError(f"{table.name} has no unique index to upsert on.")
+
+
+def insert_statement(dialect_name: str, table, update: bool = False):
+    """
+    Build an INSERT for `table` that resolves conflicts on its unique index.
+
+    Args:
+        dialect_name (str): Name of the engine dialect.
+        table (Table): Target table.
+        update (bool): Overwrite the existing row (and bump `updated_at`) instead of skipping the new one.
+
+    Returns:
+        Insert: ``ON CONFLICT`` statement on PostgreSQL and SQLite, plain INSERT elsewhere.
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+
+    statement = dialect_insert(table)
+    keys = upsert_keys(table)
+    if not update:
+        return statement.on_conflict_do_nothing(index_elements=keys)
+
+    skip = set(keys) | {column.name for column in table.primary_key} | {"created_at"}
+    values = {column.name: statement.excluded[column.name] for column in table.columns if column.name not in skip}
+    if "updated_at" in table.columns:
+        values["updated_at"] = func.now()
+    return statement.on_conflict_do_update(index_elements=keys, set_=values)